@@ -1,15 +1,17 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from app.services.ingest_service import ingest_events_from_file
-from app.services import openrouteservice_client, qdrant_client
+from fastapi import APIRouter, HTTPException, UploadFile, File, Request, Response, Query, Header, Depends
+from app.services.ingest_service import ingest_events_from_file, archive_expired_events, expire_events
+from app.services import route_service, qdrant_client, region_router, cache_service, change_log, snapshot_service, resilience, route_table, search_strategy, collection_registry
+from app.core.config import RESPONSE_CACHE_MAX_AGE, EXPORT_DIR, ADMIN_TOKEN, BATCH_DEADLINE_SECONDS
+from fastapi.responses import ORJSONResponse
 from app.models import schemas
-from shapely.geometry import LineString, Point
-import numpy as np
-import geopandas as gpd
-from qdrant_client.http import models as qmodels
-from app.core.config import DENSE_MODEL_NAME, SPARSE_MODEL_NAME, COLLECTION_NAME
-from fastembed import TextEmbedding, SparseTextEmbedding
+from datetime import datetime
+from typing import Optional, Literal
 import os
+import hmac
 import shutil
+import asyncio
+import orjson
+import msgpack
 
 # Import the extraction function and Pydantic models
 from app.services.extraction_service import extract_payload
@@ -19,110 +21,107 @@ from fastapi import HTTPException
 
 router = APIRouter()
 
-# Initialize embedding models once for reuse
-dense_embedding_model = TextEmbedding(DENSE_MODEL_NAME)
-sparse_embedding_model = SparseTextEmbedding(SPARSE_MODEL_NAME)
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
 
 
-@router.post("/create_map")
-async def create_event_map(request: schemas.RouteRequest):
-    try:
-        origin_point = openrouteservice_client.geocode_address(request.origin_address)
-        destination_point = openrouteservice_client.geocode_address(request.destination_address)
-        coords = [origin_point, destination_point]
-
-        routes = openrouteservice_client.get_route(coords, profile=request.profile_choice)
-        route_geometry = routes['features'][0]['geometry']
-        route_coords = route_geometry['coordinates']
-        if len(route_coords) < 2:
-            raise HTTPException(status_code=400, detail="Route must contain two different address for buffering.")
-
-        route_line = LineString(route_coords)
-        route_gdf = gpd.GeoDataFrame([{'geometry': route_line}], crs='EPSG:4326')
-
-        route_gdf_3857 = route_gdf.to_crs(epsg=3857)
-        buffer_polygon = route_gdf_3857.buffer(request.buffer_distance * 1000).to_crs(epsg=4326).iloc[0]
-        polygon_coords = np.array(buffer_polygon.exterior.coords).tolist()
-        polygon_coords_qdrant = [{"lon": lon, "lat": lat} for lon, lat in polygon_coords]
-
-        geo_filter = qmodels.Filter(
-            must=[
-                qmodels.FieldCondition(
-                    key="location",
-                    geo_polygon=qmodels.GeoPolygon(
-                        exterior=qmodels.GeoLineString(points=polygon_coords_qdrant)
-                    )
-                )
-            ]
-        )
-
-        date_intersection_filter = qmodels.Filter(
-            must=[
-                qmodels.FieldCondition(
-                    key="start_date",
-                    range=qmodels.DatetimeRange(lte=request.endinputdate)
-                ),
-                qmodels.FieldCondition(
-                    key="end_date",
-                    range=qmodels.DatetimeRange(gte=request.startinputdate)
-                )
-            ]
-        )
-
-        final_filter = qmodels.Filter(must=geo_filter.must + date_intersection_filter.must)
-
-        score_treshold = 0.0
-        if request.query_text.strip() == "":
-            score_treshold = 0.0  # No text query, so no score threshold
-        else:
-            score_treshold = 0.34  # Adjust based on desired relevance I found 0.34 to be a good balance
-
-        query_dense_vector = list(dense_embedding_model.passage_embed([request.query_text]))[0].tolist()
-        query_sparse_embedding = list(sparse_embedding_model.passage_embed([request.query_text]))[0]
-
-        payloads = qdrant_client.query_events_hybrid(
-            dense_vector=query_dense_vector,
-            sparse_vector=query_sparse_embedding,
-            query_filter=final_filter,
-            collection_name=COLLECTION_NAME,
-            limit=request.numevents,
-            score_threshold=score_treshold  # Optional: filter out low-score results
-        )
+def wants_msgpack(http_request: Request) -> bool:
+    accept = http_request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
 
-        if not payloads:
-            return {"message": "No events found in Qdrant for this route/buffer and date range."}
 
-        def distance_along_route(event):
-            point = Point(event['location']['lon'], event['location']['lat'])
-            return route_line.project(point)
+def json_body(content) -> bytes:
+    # Same encoding as ORJSONResponse
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
 
-        sorted_events = sorted(payloads, key=distance_along_route)
 
-        for event in sorted_events:
-            loc = event.get('location', {})
-            event['address'] = loc.get('address')
-            event['lat'] = loc.get('lat')
-            event['lon'] = loc.get('lon')
+def negotiate_body(http_request: Request, body: bytes, headers=None):
+    # Like negotiate, for a response already serialized with json_body
+    if wants_msgpack(http_request):
+        return Response(content=msgpack.packb(orjson.loads(body)), media_type="application/msgpack", headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
-        response = {
-            "route_coords": route_coords,
-            "buffer_polygon": polygon_coords,
-            "origin": {"lat": origin_point[1], "lon": origin_point[0], "address": request.origin_address},
-            "destination": {"lat": destination_point[1], "lon": destination_point[0], "address": request.destination_address},
-            "events": sorted_events
-        }
+def negotiate(http_request: Request, content, headers=None):
+    # MessagePack when the client asks for it via Accept, JSON otherwise
+    if wants_msgpack(http_request):
+        return Response(content=msgpack.packb(content), media_type="application/msgpack", headers=headers)
+    return ORJSONResponse(content, headers=headers)
 
 
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    # Destructive endpoints are disabled unless ADMIN_TOKEN is set, and then need it in X-Admin-Token.
+    # The custom header also means a browser cannot send these requests cross-origin without a preflight.
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
 
-        return response
 
+@router.post("/create_map")
+async def create_event_map(request: schemas.RouteRequest, http_request: Request):
+    # Identical requests are served from the response cache until ingestion changes a collection they read
+    route_table.log_request(request)
+    key = cache_service.request_key(request)
+    cached = cache_service.get_response(key)
+    if cached is not None:
+        versions, body = cached
+        fallback = False
+    else:
+        versions_before = dict(cache_service.get_collection_versions())
+        touched_collections = set()
+        try:
+            response = await route_service.create_event_map(request, touched_collections)
+        except resilience.ServiceUnavailable:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        versions = {name: versions_before.get(name, 0) for name in touched_collections}
+        body = json_body(response)
+        # A sparse-only answer given because hybrid was slow is not kept for later requests
+        fallback = bool(response.get("search_fallback"))
+        if not fallback:
+            cache_service.put_response(key, versions, body)
+
+    etag = cache_service.make_etag(key, versions, "msgpack" if wants_msgpack(http_request) else "json", fallback)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={RESPONSE_CACHE_MAX_AGE}", "Vary": "Accept"}
+    if etag in http_request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return negotiate_body(http_request, body, headers)
+
+
+@router.post("/create_map_batch")
+async def create_event_map_batch(batch: schemas.BatchRouteRequest, http_request: Request):
+    # Errors are reported per item, so one bad request does not abort the batch
+    token = resilience.set_deadline(BATCH_DEADLINE_SECONDS)
+    try:
+        return negotiate(http_request, {"results": await route_service.create_event_maps_batch(batch.requests)})
+    except resilience.ServiceUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        resilience.reset_deadline(token)
+
+
+@router.get("/events/{event_id}")
+async def get_event_details(event_id: str):
+    # Full payload of one event, for clients that fetched lightweight markers with `fields`
+    await collection_registry.ensure_loaded()
+    event = await resilience.call("qdrant", qdrant_client.get_event, event_id, region_router.all_collections())
+    if event is None:
+        raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
+    return event
 
 
 @router.post("/ingestevents")
-async def ingest_events_endpoint(file: UploadFile = File(...)):
+async def ingest_events_endpoint(
+    file: UploadFile = File(...),
+    mode: Literal["upsert", "sync"] = "upsert",
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    if mode == "sync":
+        # sync deletes events missing from the feed
+        require_admin(x_admin_token)
     if not file.filename.endswith(".json"):
         raise HTTPException(status_code=400, detail="Only .json files are accepted")
 
@@ -134,7 +133,9 @@ async def ingest_events_endpoint(file: UploadFile = File(...)):
         shutil.copyfileobj(file.file, buffer)
 
     try:
-        result = await ingest_events_from_file(save_path)
+        result = await ingest_events_from_file(save_path, sync=(mode == "sync"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     finally:
         if os.path.exists(save_path):
             os.remove(save_path)
@@ -144,21 +145,91 @@ async def ingest_events_endpoint(file: UploadFile = File(...)):
         "inserted": result["inserted"],
         "updated": result["updated"],
         "skipped_unchanged": result["skipped_unchanged"],
+        "failed": result["failed"],
+        "deleted": result["deleted"],
         "collection_info": str(result["collection_info"]),
     }
 
 
+@router.post("/archiveexpired", dependencies=[Depends(require_admin)])
+async def archive_expired_endpoint(before: Optional[datetime] = None):
+    try:
+        return await asyncio.to_thread(archive_expired_events, before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Archiving failed: {str(e)}")
+
+
+@router.get("/changes")
+async def get_changes(since: int = Query(default=0, ge=0), limit: int = Query(default=1000, ge=1, le=10000)):
+    # Incremental feed of inserted/updated/deleted events; poll again with since=next_since
+    return await asyncio.to_thread(change_log.read_changes, since, limit)
+
+
+@router.post("/expireevents", dependencies=[Depends(require_admin)])
+async def expire_events_endpoint(mode: Literal["delete", "archive"] = "delete", before: Optional[datetime] = None):
+    try:
+        return await asyncio.to_thread(expire_events, mode, before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Expiry failed: {str(e)}")
+
+
+@router.post("/admin/export", dependencies=[Depends(require_admin)])
+async def export_collections_endpoint():
+    # Writes one export file per region collection into EXPORT_DIR
+    try:
+        return {"exports": await asyncio.to_thread(snapshot_service.export_collections, EXPORT_DIR)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+
+
+@router.post("/admin/import", dependencies=[Depends(require_admin)])
+async def import_collection_endpoint(
+    filename: str,
+    collection: Optional[str] = None,
+    parallel: int = Query(default=4, ge=1, le=32),
+    activate: Optional[bool] = None,
+):
+    # Only files inside EXPORT_DIR can be imported
+    path = os.path.join(EXPORT_DIR, os.path.basename(filename))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Export {filename} not found")
+    try:
+        return await asyncio.to_thread(snapshot_service.import_collection, path, collection, 256, parallel, activate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+
+
+@router.get("/status")
+async def service_status():
+    # In-flight requests and circuit breaker state of each external dependency (this worker only)
+    return resilience.status()
+
+
+@router.get("/stats/search")
+async def search_stats():
+    # Per search mode: requests, auto selections, budget fallbacks and latency percentiles (this worker only)
+    return search_strategy.get_stats()
+
+
 @router.post("/sentencetopayload")
 async def sentence_to_payload(data: SentenceInput):
     sentence = data.sentence
     try:
-        output = extract_payload(sentence)
+        output = await resilience.call("llm", extract_payload, sentence)
         if output:
             return output.model_dump()
         else:
             raise HTTPException(status_code=400, detail="Failed to extract valid payload or validation error")
     except ValidationError as e:
         raise HTTPException(status_code=422, detail=e.errors())
+    except resilience.ServiceUnavailable:
+        raise
     except Exception as e:
         # Other unexpected errors
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
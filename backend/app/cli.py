@@ -0,0 +1,161 @@
+import argparse
+import json
+import logging
+
+# Admin command line, run from the backend directory:
+#   python -m app.cli export --output-dir /backups
+#   python -m app.cli import /backups/veneto_events.jsonl.gz --parallel 8
+#   python -m app.cli ingest events.json --workers 8 --threads 2
+#   python -m app.cli precompute-routes --source places --limit 200
+#   python -m app.cli reindex veneto_events --dense-model BAAI/bge-small-en-v1.5
+#   python -m app.cli activate veneto_events veneto_events_v1   (roll back)
+#   python -m app.cli backfill   (then enable TEMPORAL_PREFILTER / GEO_PREFILTER)
+
+
+def cmd_export(args):
+    from app.services import snapshot_service
+    return snapshot_service.export_collections(args.output_dir, args.collection or None)
+
+
+def cmd_import(args):
+    from app.services import snapshot_service
+    return [
+        snapshot_service.import_collection(
+            path, args.collection, batch_size=args.batch_size, parallel=args.parallel, activate=args.activate or None
+        )
+        for path in args.paths
+    ]
+
+
+def cmd_ingest(args):
+    from app.services import bulk_ingest
+    return bulk_ingest.bulk_ingest(
+        args.path,
+        workers=args.workers,
+        threads=args.threads,
+        shard_size=args.shard_size,
+        upload_parallel=args.upload_parallel,
+        checkpoint_path=args.checkpoint,
+        geocode=args.geocode,
+    )
+
+
+def cmd_precompute_routes(args):
+    from app.services import route_table
+    return route_table.precompute_routes(
+        source=args.source,
+        limit=args.limit or route_table.ROUTE_TABLE_SIZE,
+        profiles=args.profile,
+        buffers=args.buffer,
+        path=args.output or route_table.ROUTE_TABLE_PATH,
+    )
+
+
+def cmd_reindex(args):
+    from app.services import reindex_service
+    queries = None
+    if args.queries_file:
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    return reindex_service.reindex(
+        args.collection,
+        dense_model=args.dense_model,
+        sparse_model=args.sparse_model,
+        queries=queries,
+        max_recall_drop=args.max_recall_drop,
+        swap=not args.no_swap,
+        force=args.force,
+        batch_size=args.batch_size,
+    )
+
+
+def cmd_activate(args):
+    from app.services import reindex_service
+    return reindex_service.activate(args.collection, args.physical)
+
+
+def cmd_drop_collection(args):
+    from app.services import reindex_service
+    return reindex_service.drop_collection(args.collection, args.physical)
+
+
+def cmd_backfill(args):
+    from app.services import ingest_service
+    return ingest_service.backfill_prefilter_fields(args.collection or None, batch_size=args.batch_size)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="ReMap backend admin commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export collections (vectors + payloads) to gzipped JSON lines")
+    export_parser.add_argument("--output-dir", required=True)
+    export_parser.add_argument("--collection", action="append", help="Collection to export (repeatable), default all regions")
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = commands.add_parser("import", help="Bulk-load export files back into Qdrant")
+    import_parser.add_argument("paths", nargs="+")
+    import_parser.add_argument("--collection", help="Target collection, default the one recorded in the file")
+    import_parser.add_argument("--batch-size", type=int, default=256)
+    import_parser.add_argument("--parallel", type=int, default=4)
+    import_parser.add_argument("--activate", action="store_true",
+                               help="Serve the configured collection from an imported <name>_vN collection "
+                                    "(default: only when nothing serves it yet)")
+    import_parser.set_defaults(func=cmd_import)
+
+    ingest_parser = commands.add_parser("ingest", help="Embed and load an events file using every core, resumable")
+    ingest_parser.add_argument("path", help="Events JSON file ({\"events\": [...]}), ideally already geocoded")
+    ingest_parser.add_argument("--workers", type=int, help="Embedding processes, default one per CPU")
+    ingest_parser.add_argument("--threads", type=int, default=1, help="ONNX Runtime threads per embedding process")
+    ingest_parser.add_argument("--shard-size", type=int, default=256)
+    ingest_parser.add_argument("--upload-parallel", type=int, default=4)
+    ingest_parser.add_argument("--checkpoint", help="Resume file, default <path>.checkpoint.json")
+    ingest_parser.add_argument("--geocode", action="store_true", help="Geocode events without coordinates first")
+    ingest_parser.set_defaults(func=cmd_ingest)
+
+    routes_parser = commands.add_parser("precompute-routes", help="Route and buffer frequent trips into the route table")
+    routes_parser.add_argument("--source", choices=["log", "places"], default="log",
+                               help="Most requested trips from the request counts, or pairs of gazetteer towns")
+    routes_parser.add_argument("--limit", type=int, help="Number of trips, default ROUTE_TABLE_SIZE")
+    routes_parser.add_argument("--profile", action="append", help="Routing profile for --source places (repeatable)")
+    routes_parser.add_argument("--buffer", type=float, action="append", help="Buffer km for --source places (repeatable)")
+    routes_parser.add_argument("--output", help="Route table file, default ROUTE_TABLE_PATH")
+    routes_parser.set_defaults(func=cmd_precompute_routes)
+
+    reindex_parser = commands.add_parser("reindex", help="Rebuild a collection with new embedding models and swap it in")
+    reindex_parser.add_argument("collection", help="Configured (logical) collection name, e.g. veneto_events")
+    reindex_parser.add_argument("--dense-model", help="Default DENSE_MODEL_NAME")
+    reindex_parser.add_argument("--sparse-model", help="Default SPARSE_MODEL_NAME")
+    reindex_parser.add_argument("--queries-file", help="Extra benchmark queries, one per line")
+    reindex_parser.add_argument("--max-recall-drop", type=float, default=0.05,
+                                help="Largest known-item recall loss that still activates the new collection")
+    reindex_parser.add_argument("--no-swap", action="store_true", help="Build and benchmark only")
+    reindex_parser.add_argument("--force", action="store_true", help="Activate even if the benchmark fails")
+    reindex_parser.add_argument("--batch-size", type=int, default=128)
+    reindex_parser.set_defaults(func=cmd_reindex)
+
+    activate_parser = commands.add_parser("activate", help="Serve a logical collection from another physical collection")
+    activate_parser.add_argument("collection")
+    activate_parser.add_argument("physical")
+    activate_parser.set_defaults(func=cmd_activate)
+
+    drop_parser = commands.add_parser("drop-collection", help="Delete a retired physical collection")
+    drop_parser.add_argument("collection")
+    drop_parser.add_argument("physical")
+    drop_parser.set_defaults(func=cmd_drop_collection)
+
+    backfill_parser = commands.add_parser("backfill", help="Add prefilter payload fields to points ingested before they existed")
+    backfill_parser.add_argument("--collection", action="append", help="Collection to backfill (repeatable), default all regions")
+    backfill_parser.add_argument("--batch-size", type=int, default=256)
+    backfill_parser.set_defaults(func=cmd_backfill)
+    return parser
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args(argv)
+    print(json.dumps(args.func(args), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
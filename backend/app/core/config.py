@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os
+import json
 
 load_dotenv(dotenv_path="../.env")
 
@@ -15,4 +16,96 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL")
 # Add dense and sparse model names to config
 DENSE_MODEL_NAME = os.getenv("DENSE_MODEL_NAME")
 SPARSE_MODEL_NAME = os.getenv("SPARSE_MODEL_NAME")
-COLLECTION_NAME = "veneto_events"
\ No newline at end of file
+# Optional embedding sidecar: when set, API workers delegate inference to one shared process
+# instead of loading their own copy of the models (socket path takes precedence over URL)
+EMBEDDING_SERVICE_SOCKET = os.getenv("EMBEDDING_SERVICE_SOCKET")
+EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL")
+EMBEDDING_SERVICE_TIMEOUT = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT", "15"))
+# Region-aware collection routing: each region has its own collection and a lon/lat bounding box
+# [min_lon, min_lat, max_lon, max_lat]. REGIONS_FILE may point to a JSON file with the same shape.
+REGIONS = {
+    "veneto": {"collection": "veneto_events", "bbox": [10.6, 44.7, 13.2, 46.7]},
+}
+REGIONS_FILE = os.getenv("REGIONS_FILE")
+if REGIONS_FILE:
+    with open(REGIONS_FILE, "r", encoding="utf-8") as f:
+        REGIONS = json.load(f)
+DEFAULT_REGION = os.getenv("DEFAULT_REGION", "veneto")
+COLLECTION_NAME = REGIONS[DEFAULT_REGION]["collection"]
+# Coarse week-bucket prefilter in front of the exact date range check. Points without week_buckets
+# are filtered out, so enable it only once every point has them (python -m app.cli backfill)
+TEMPORAL_PREFILTER = os.getenv("TEMPORAL_PREFILTER", "false").lower() == "true"
+TEMPORAL_PREFILTER_MAX_WEEKS = int(os.getenv("TEMPORAL_PREFILTER_MAX_WEEKS", "104"))
+# Geohash cell prefilter in front of the exact geo_polygon check. Points without geohash_N fields
+# are filtered out, so enable it only once every point has them (python -m app.cli backfill)
+GEO_PREFILTER = os.getenv("GEO_PREFILTER", "false").lower() == "true"
+GEO_PREFILTER_MAX_CELLS = int(os.getenv("GEO_PREFILTER_MAX_CELLS", "512"))
+# Time-aware routing: corridor slice length (travel minutes) and maximum slices per route or leg
+TIME_AWARE_SLICE_MINUTES = float(os.getenv("TIME_AWARE_SLICE_MINUTES", "30"))
+TIME_AWARE_MAX_SLICES = int(os.getenv("TIME_AWARE_MAX_SLICES", "24"))
+# /create_map response cache, invalidated through per-collection versions bumped by ingestion
+COLLECTION_VERSIONS_PATH = os.getenv("COLLECTION_VERSIONS_PATH", "/tmp/remap/collection_versions.json")
+# Responses are cached serialized; RESPONSE_CACHE_MAX_BYTES bounds their total size per worker
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "60"))
+# Append-only log of inserted/updated/deleted events, served by GET /changes
+CHANGELOG_PATH = os.getenv("CHANGELOG_PATH", "/tmp/remap/changes.jsonl")
+# Scheduled expiry of events past end_date: "delete" or "archive", every EXPIRY_INTERVAL_SECONDS (0 disables)
+EXPIRY_MODE = os.getenv("EXPIRY_MODE", "archive")
+EXPIRY_INTERVAL_SECONDS = int(os.getenv("EXPIRY_INTERVAL_SECONDS", "0"))
+# Lock files electing the single worker that runs scheduled jobs on a node
+SCHEDULER_LOCK_DIR = os.getenv("SCHEDULER_LOCK_DIR", "/tmp/remap/locks")
+# Token required (X-Admin-Token header) by destructive admin endpoints: expiry, archiving, sync
+# ingest, export/import. Unset disables those endpoints.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Collection export/import files (admin endpoints only read and write inside this directory)
+EXPORT_DIR = os.getenv("EXPORT_DIR", "/tmp/remap/exports")
+# Admission control: requests in flight per worker before answering 503 (0 disables) and the
+# end-to-end deadline every outbound call of a request has to fit in
+MAX_IN_FLIGHT_REQUESTS = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", "64"))
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "20"))
+# /create_map_batch routes up to 500 itineraries, so it gets its own, longer deadline
+BATCH_DEADLINE_SECONDS = float(os.getenv("BATCH_DEADLINE_SECONDS", "120"))
+OVERLOAD_RETRY_AFTER = int(os.getenv("OVERLOAD_RETRY_AFTER", "2"))
+# Per-dependency limits: call timeout (seconds) and concurrent calls per worker. Keep timeouts below
+# REQUEST_DEADLINE_SECONDS: a call cut short by the deadline does not count against the dependency.
+ORS_TIMEOUT = float(os.getenv("ORS_TIMEOUT", "10"))
+ORS_MAX_CONCURRENCY = int(os.getenv("ORS_MAX_CONCURRENCY", "8"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))
+QDRANT_MAX_CONCURRENCY = int(os.getenv("QDRANT_MAX_CONCURRENCY", "32"))
+QDRANT_INGEST_TIMEOUT = int(os.getenv("QDRANT_INGEST_TIMEOUT", "300"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "15"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+# Query embeddings (sidecar request or local inference) run in threads; timeout is EMBEDDING_SERVICE_TIMEOUT
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+# How long a call may wait for a free slot before it is shed (0 = until the request deadline)
+DEPENDENCY_QUEUE_TIMEOUT = float(os.getenv("DEPENDENCY_QUEUE_TIMEOUT", "0"))
+# Circuit breaker: consecutive failures that open it, and seconds before a trial call is let through
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+# Geocoding results are cached; expired entries are still served while ORS is unavailable
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "4096"))
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", "86400"))
+# Precomputed routes for frequent (origin, destination, profile, buffer) trips, served without ORS.
+# Workers count /create_map trips in memory and merge them every ROUTE_REQUEST_FLUSH_SECONDS into
+# ROUTE_REQUEST_COUNTS_PATH (empty disables counting), which keeps the ROUTE_REQUEST_COUNTS_SIZE most
+# requested trips for picking them.
+ROUTE_TABLE_PATH = os.getenv("ROUTE_TABLE_PATH", "/tmp/remap/route_table.json.gz")
+ROUTE_REQUEST_COUNTS_PATH = os.getenv("ROUTE_REQUEST_COUNTS_PATH", "/tmp/remap/route_request_counts.json")
+ROUTE_REQUEST_FLUSH_SECONDS = int(os.getenv("ROUTE_REQUEST_FLUSH_SECONDS", "60"))
+ROUTE_TABLE_SIZE = int(os.getenv("ROUTE_TABLE_SIZE", "500"))
+ROUTE_REQUEST_COUNTS_SIZE = int(os.getenv("ROUTE_REQUEST_COUNTS_SIZE", str(10 * ROUTE_TABLE_SIZE)))
+ROUTE_TABLE_REFRESH_SECONDS = int(os.getenv("ROUTE_TABLE_REFRESH_SECONDS", "0"))
+# Gazetteer for seeding the route table (a copy of dataset/villages_places.json shipped in the image)
+PLACES_PATH = os.getenv("PLACES_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "villages_places.json"))
+# Seconds a worker caches which physical collection (<collection>_vN) serves each configured
+# collection name and the models of every collection (both are read from Qdrant aliases and metadata)
+COLLECTION_REGISTRY_TTL = float(os.getenv("COLLECTION_REGISTRY_TTL", "10"))
+# Search strategy: queries of at most SEARCH_SHORT_QUERY_TOKENS words run sparse-only in "auto" mode;
+# "hybrid_budget" answers with the sparse-only result when hybrid misses SEARCH_LATENCY_BUDGET_MS
+SEARCH_SHORT_QUERY_TOKENS = int(os.getenv("SEARCH_SHORT_QUERY_TOKENS", "2"))
+SEARCH_LATENCY_BUDGET_MS = float(os.getenv("SEARCH_LATENCY_BUDGET_MS", "150"))
+SEARCH_STATS_WINDOW = int(os.getenv("SEARCH_STATS_WINDOW", "1000"))
+# Qdrant server-side timeout (whole seconds) of the hybrid and fallback queries of "hybrid_budget"
+SEARCH_BUDGET_QUERY_TIMEOUT = int(os.getenv("SEARCH_BUDGET_QUERY_TIMEOUT", "1"))
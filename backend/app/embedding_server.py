@@ -0,0 +1,39 @@
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from app.services import embedding_service
+
+# Single-process embedding sidecar shared by all API workers, e.g.
+#   uvicorn app.embedding_server:app --uds /tmp/remap-embed.sock
+# and start the API with EMBEDDING_SERVICE_SOCKET=/tmp/remap-embed.sock
+
+
+class EmbedRequest(BaseModel):
+    kind: Literal["dense", "sparse"]
+    texts: List[str]
+    model: Optional[str] = None  # default DENSE_MODEL_NAME / SPARSE_MODEL_NAME
+
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
+
+@app.on_event("startup")
+def preload_models():
+    embedding_service.load_models()
+
+
+@app.post("/embed")
+def embed(request: EmbedRequest):
+    # Always run inference locally here, never forward to another sidecar
+    if request.kind == "dense":
+        embeddings = embedding_service.local_embed_dense(request.texts, request.model)
+    else:
+        embeddings = [emb.model_dump() for emb in embedding_service.local_embed_sparse(request.texts, request.model)]
+    return {"embeddings": embeddings}
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
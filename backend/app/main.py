@@ -1,9 +1,15 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse
 from app.api.routes import router  # Import your routes module here
+from app.services import scheduler, resilience, route_table, collection_registry
+from app.core.config import REQUEST_DEADLINE_SECONDS, OVERLOAD_RETRY_AFTER
 
 from fastapi.middleware.cors import CORSMiddleware
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(default_response_class=ORJSONResponse)  # Use ORJSON for faster JSON responses
 
 
@@ -11,6 +17,52 @@ app = FastAPI(default_response_class=ORJSONResponse)  # Use ORJSON for faster JS
 app.include_router(router)
 
 
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    # Shed load with 503 + Retry-After once the worker is full, instead of letting latency grow;
+    # admitted requests get a deadline that bounds every outbound call they make
+    if not resilience.try_admit():
+        return ORJSONResponse(
+            {"detail": "Server overloaded, retry later"},
+            status_code=503,
+            headers={"Retry-After": str(OVERLOAD_RETRY_AFTER)},
+        )
+    token = resilience.set_deadline(REQUEST_DEADLINE_SECONDS)
+    try:
+        return await call_next(request)
+    finally:
+        resilience.reset_deadline(token)
+        resilience.release()
+
+
+@app.exception_handler(resilience.ServiceUnavailable)
+async def service_unavailable_handler(request: Request, exc: resilience.ServiceUnavailable):
+    return ORJSONResponse(
+        {"detail": str(exc)},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    # Periodic jobs (e.g. event expiry) run in exactly one worker per node
+    scheduler.start_background_jobs()
+    # Warm the precomputed route table so the first frequent trips skip ORS too
+    route_table.load()
+    # Load the collection registry; if Qdrant is not reachable yet the first request loads it
+    try:
+        await asyncio.to_thread(collection_registry.refresh)
+    except Exception as e:
+        logger.warning(f"Could not load the collection registry: {e}")
+
+
+@app.on_event("shutdown")
+async def flush_route_requests():
+    # Keep the trips counted since the last periodic flush
+    route_table.flush_requests()
+
+
 # CORS configuration
 origins = [
     "*"  # You can specify frontend origins here if needed
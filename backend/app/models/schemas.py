@@ -1,21 +1,36 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, Literal
+from typing import Optional, Literal, List
 
 ProfileChoice = Literal["driving-car", "cycling-regular", "foot-walking"]
+GeometryFormat = Literal["coordinates", "polyline", "geojson"]
+SearchMode = Literal["auto", "sparse", "dense", "hybrid", "hybrid_budget"]
 
 
 class RouteRequest(BaseModel):
     origin_address: str = Field(..., example="Padova")
     destination_address: str = Field(..., example="Verona")
+    waypoints: List[str] = Field(default=[], example=["Vicenza"], description="Ordered intermediate stops between origin and destination")
     buffer_distance: Optional[float] = Field(default=5.0, example=5.0)  # Optional float with default
     #buffer_distance: int = Field(default=5, example=5)  # default value 5
     startinputdate: datetime = Field(..., example="2025-08-23T13:28:39Z")
     endinputdate: datetime = Field(..., example="2025-08-27T13:28:39Z")
     query_text: Optional[str] = Field(default="", example="Music")
-    numevents: Optional[int] = Field(default=100, example=100, description="Number of events to retrieve")  # default 100
+    search_mode: SearchMode = Field(default="auto", description="sparse (keywords), dense (semantic), hybrid (both, RRF), hybrid_budget (hybrid, sparse if it is too slow); auto picks from the query length")
+    numevents: int = Field(default=100, ge=1, le=1000, example=100, description="Number of events to retrieve (page size)")  # default 100
+    offset: int = Field(default=0, ge=0, example=0, description="Events to skip in the fused ranking, use next_offset of the previous page")
+    fields: Optional[List[str]] = Field(default=None, example=["title"], description="Payload fields to return (id, location and score are always included), default all")
     profile_choice: Optional[ProfileChoice] = Field(default="driving-car", example="cycling-regular", description="Transport profile for routing, e.g. 'driving-car', 'cycling-regular'") # default 'driving-car'
+    time_aware: bool = Field(default=False, description="Match each part of the corridor against the time the traveller is estimated to pass it")
+    dwell_minutes: float = Field(default=0.0, ge=0, example=60, description="Time-aware mode: extra minutes the traveller may stop at an event")
 
+    geometry_format: GeometryFormat = Field(default="coordinates", description="Encoding of route_coords/buffer_polygon: nested coordinates, Google encoded polylines, or a GeoJSON FeatureCollection")
+    coordinate_precision: Optional[int] = Field(default=None, ge=0, le=10, example=5, description="Decimals kept in returned coordinates (polyline default 5)")
+    simplify_zoom: Optional[int] = Field(default=None, ge=0, le=22, example=12, description="Simplify the returned route and buffer to one pixel at this web map zoom level")
+
+
+class BatchRouteRequest(BaseModel):
+    requests: List[RouteRequest] = Field(..., max_length=500, description="Route queries answered in order, at most 500 per batch")
 
 
 class SentenceInput(BaseModel):
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.services import ingest_service, embedding_service, region_router, cache_service, change_log, collection_registry
+
+
+logger = logging.getLogger(__name__)
+
+# Offline bulk ingest: events are sharded across a process pool that runs FastEmbed locally
+# (one dense + one sparse model per process), while a thread pool uploads the finished shards.
+# Point ids are deterministic, so a shard that is re-processed after a crash overwrites itself.
+
+
+def _init_worker(threads: int):
+    # Runs once in every worker process, before the models are loaded
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    embedding_service.use_local_models(threads)
+    embedding_service.load_models()
+
+
+def _embed_shard(shard_index: int, texts: List[str], text_models: List[Tuple[str, str]]) -> Tuple[int, List[List[float]], List[Any]]:
+    # text_models[i] is the (dense, sparse) model pair of the collection texts[i] goes to
+    dense, sparse = [None] * len(texts), [None] * len(texts)
+    by_models = {}
+    for i, model_pair in enumerate(text_models):
+        by_models.setdefault(tuple(model_pair), []).append(i)
+    for (dense_model, sparse_model), indices in by_models.items():
+        group = [texts[i] for i in indices]
+        for i, d, s in zip(
+            indices,
+            embedding_service.local_embed_dense(group, dense_model),
+            embedding_service.local_embed_sparse(group, sparse_model),
+        ):
+            dense[i], sparse[i] = d, s
+    return shard_index, dense, sparse
+
+
+def _load_checkpoint(path: str, source: str, shard_size: int) -> set:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != os.path.abspath(source) or checkpoint.get("shard_size") != shard_size:
+        # Shard numbering only lines up for the same file and shard size
+        raise ValueError(f"Checkpoint {path} was written for a different source file or shard size")
+    return set(checkpoint.get("done", []))
+
+
+def _save_checkpoint(path: str, source: str, shard_size: int, done: set):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.abspath(source), "shard_size": shard_size, "done": sorted(done)}, f)
+    os.replace(tmp_path, path)
+
+
+def _pending_events(shard: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str], Dict[str, Any], int]:
+    # Drop events whose stored copy is already up to date, before paying for their embeddings
+    by_collection = {}
+    for event in shard:
+        if event.get("id"):
+            by_collection.setdefault(region_router.collection_for_event(event), []).append(event)
+
+    pending, collections, existing, skipped = [], [], {}, 0
+    for collection_name, events in by_collection.items():
+        if ingest_service.client.collection_exists(collection_name):
+            stored = ingest_service.existing_points(collection_name, [e["id"] for e in events])
+        else:
+            stored = {}
+        for event in events:
+            points = stored.get(event["id"], [])
+            chunk_hash = ingest_service.calculate_hash(event.get("description", ""))
+            if points and ingest_service.is_unchanged(points, chunk_hash):
+                skipped += 1
+                continue
+            pending.append(event)
+            collections.append(collection_name)
+            existing[event["id"]] = points
+    return pending, collections, existing, skipped
+
+
+def bulk_ingest(
+    json_path: str,
+    workers: Optional[int] = None,
+    threads: int = 1,
+    shard_size: int = 256,
+    upload_parallel: int = 4,
+    checkpoint_path: Optional[str] = None,
+    geocode: bool = False,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    checkpoint_path = checkpoint_path or json_path + ".checkpoint.json"
+
+    logger.info(f"Loading events from {json_path}")
+    with open(json_path, "r", encoding="utf-8") as f:
+        events = json.load(f).get("events", [])
+
+    if geocode:
+        missing = [e for e in events if e.get("location", {}).get("latitude") is None]
+        logger.info(f"Geocoding {len(missing)} events without coordinates")
+        asyncio.run(ingest_service.geocode_events(missing))
+
+    shards = [events[start : start + shard_size] for start in range(0, len(events), shard_size)]
+    done = _load_checkpoint(checkpoint_path, json_path, shard_size)
+    todo = [i for i in range(len(shards)) if i not in done]
+    logger.info(
+        f"{len(events)} events in {len(shards)} shards, {len(done)} already done; "
+        f"embedding with {workers} processes x {threads} threads"
+    )
+
+    stats = {"inserted": 0, "updated": 0, "skipped_unchanged": 0}
+    changed_collections = set()
+    written_to = {}
+    ready_collections = set()
+    pending_by_shard = {}
+
+    def upload(shard_index, dense, sparse):
+        events, collections, existing, _ = pending_by_shard.pop(shard_index)
+        points_by_collection = {}
+        stale_by_collection = {}
+        changes = []
+        for i, event in enumerate(events):
+            collection_name = collections[i]
+            chunk_hash = ingest_service.calculate_hash(event.get("description", ""))
+            stored = existing[event["id"]]
+            stale_by_collection.setdefault(collection_name, []).extend(
+                p.id for p in stored if str(p.id) != ingest_service.point_id(event["id"])
+            )
+            changes.append(("update" if stored else "insert", collection_name, event["id"]))
+            points_by_collection.setdefault(collection_name, []).append(
+                ingest_service.build_point(event, chunk_hash, dense[i], sparse[i])
+            )
+        # An upload error fails the shard (it is retried on the next run); older copies under other
+        # point ids are removed only once the new points are stored
+        for collection_name, points in points_by_collection.items():
+            ingest_service.client.upsert(collection_name=collection_name, points=points, wait=True)
+            if stale_by_collection[collection_name]:
+                ingest_service.client.delete(
+                    collection_name=collection_name,
+                    points_selector=ingest_service.models.PointIdsList(points=stale_by_collection[collection_name]),
+                )
+        change_log.record_changes(changes)
+        return shard_index, changes
+
+    # spawn, not fork: the parent holds Qdrant/httpx clients that must not be shared with the workers
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(threads,)) as pool, \
+                ThreadPoolExecutor(upload_parallel) as uploader:
+            embedding, uploading = set(), set()
+
+            def finish_uploads(futures):
+                for future in futures:
+                    shard_index, changes = future.result()
+                    for op, collection_name, event_id in changes:
+                        stats["inserted" if op == "insert" else "updated"] += 1
+                        changed_collections.add(collection_name)
+                        written_to[event_id] = collection_name
+                    done.add(shard_index)
+                _save_checkpoint(checkpoint_path, json_path, shard_size, done)
+
+            queue = iter(todo)
+            while True:
+                # Keep every worker busy with one queued shard, so hash lookups overlap with inference,
+                # but stop reading ahead while uploads are the bottleneck
+                while len(embedding) < workers * 2 and len(uploading) < upload_parallel * 2:
+                    shard_index = next(queue, None)
+                    if shard_index is None:
+                        break
+                    pending = _pending_events(shards[shard_index])
+                    stats["skipped_unchanged"] += pending[3]
+                    if not pending[0]:
+                        done.add(shard_index)
+                        continue
+                    pending_by_shard[shard_index] = pending
+                    texts = [event.get("description", "") for event in pending[0]]
+                    text_models = [collection_registry.models_for(name) for name in pending[1]]
+                    embedding.add(pool.submit(_embed_shard, shard_index, texts, text_models))
+                if not embedding and not uploading:
+                    break
+
+                finished, _ = wait(embedding | uploading, return_when=FIRST_COMPLETED)
+                for future in finished & embedding:
+                    embedding.discard(future)
+                    shard_index, dense, sparse = future.result()
+                    # Collections are created here, on the main thread, before any upload can target them
+                    for collection_name in set(pending_by_shard[shard_index][1]) - ready_collections:
+                        ingest_service.ensure_collection_exists(collection_name, dense_dim=len(dense[0]))
+                        ready_collections.add(collection_name)
+                    uploading.add(uploader.submit(upload, shard_index, dense, sparse))
+                finished_uploads = finished & uploading
+                uploading -= finished_uploads
+                if finished_uploads:
+                    finish_uploads(finished_uploads)
+    finally:
+        # Whatever was uploaded before a crash is skipped on the next run
+        _save_checkpoint(checkpoint_path, json_path, shard_size, done)
+
+    # The run is complete, so the next one starts from scratch (unchanged events are skipped by hash)
+    os.remove(checkpoint_path)
+    # Events written to a collection that a reindex replaced during the run are replayed on the new one
+    collection_registry.refresh()
+    moved = [e for e in events if e.get("id") in written_to and region_router.collection_for_event(e) != written_to[e["id"]]]
+    if moved:
+        logger.info(f"Replaying {len(moved)} events on collections activated during the run")
+        moved_collections = [region_router.collection_for_event(e) for e in moved]
+        for collection_name in set(moved_collections):
+            ingest_service.ensure_collection_exists(collection_name)
+        ingest_service.write_events(moved, moved_collections)
+    # Invalidate cached /create_map responses that read the loaded collections
+    cache_service.bump_collection_versions(changed_collections)
+
+    duration = time.perf_counter() - started
+    logger.info(
+        f"Bulk ingest complete in {duration:.1f}s: inserted={stats['inserted']}, "
+        f"updated={stats['updated']}, skipped={stats['skipped_unchanged']}"
+    )
+    return {
+        **stats,
+        "shards": len(shards),
+        "shards_done": len(done),
+        "duration_seconds": round(duration, 3),
+    }
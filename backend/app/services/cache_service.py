@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import fcntl
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from app.core.config import COLLECTION_VERSIONS_PATH, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL
+
+
+logger = logging.getLogger(__name__)
+
+# Collection versions live in a small JSON file so every worker on the node sees ingestion bumps
+_versions_cache = {"mtime": None, "versions": {}}
+# request key -> (created_at, {collection: version}, serialized response), least recently used first
+_responses: "OrderedDict[str, tuple]" = OrderedDict()
+_cached_bytes = {"total": 0}
+_lock = threading.Lock()
+
+
+def get_collection_versions() -> Dict[str, int]:
+    try:
+        mtime = os.stat(COLLECTION_VERSIONS_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if mtime != _versions_cache["mtime"]:
+        try:
+            with open(COLLECTION_VERSIONS_PATH, "r", encoding="utf-8") as f:
+                _versions_cache["versions"] = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read collection versions: {e}")
+            return {}
+        _versions_cache["mtime"] = mtime
+    return _versions_cache["versions"]
+
+
+def bump_collection_versions(collection_names: Iterable[str]):
+    # Called by ingestion whenever a collection's content changes
+    collection_names = list(collection_names)
+    if not collection_names:
+        return
+    os.makedirs(os.path.dirname(COLLECTION_VERSIONS_PATH) or ".", exist_ok=True)
+    with open(COLLECTION_VERSIONS_PATH, "a+", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        content = f.read()
+        versions = json.loads(content) if content.strip() else {}
+        for name in collection_names:
+            versions[name] = versions.get(name, 0) + 1
+        f.seek(0)
+        f.truncate()
+        json.dump(versions, f)
+    logger.info(f"Bumped collection versions for {collection_names}")
+
+
+def request_key(request) -> str:
+    # Canonical form of the request: same parameters give the same key whatever the JSON field order
+    canonical = json.dumps(request.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def make_etag(key: str, versions: Dict[str, int], variant: str = "", fallback: bool = False) -> str:
+    # A degraded (search_fallback) answer gets its own tag, so a client holding it gets the full one later
+    tag = hashlib.sha256(
+        f"{key}|{json.dumps(versions, sort_keys=True)}|{variant}|{'fallback' if fallback else ''}".encode("utf-8")
+    ).hexdigest()
+    return f'"{tag[:32]}"'
+
+
+def _evict(key: str):
+    _cached_bytes["total"] -= len(_responses.pop(key)[2])
+
+
+def get_response(key: str) -> Optional[tuple]:
+    # (versions, serialized response) if cached, fresh and none of the collections it read have changed since
+    with _lock:
+        entry = _responses.get(key)
+        if entry is None:
+            return None
+        created_at, versions, response = entry
+        current = get_collection_versions()
+        if time.monotonic() - created_at > RESPONSE_CACHE_TTL or any(
+            current.get(name, 0) != version for name, version in versions.items()
+        ):
+            _evict(key)
+            return None
+        _responses.move_to_end(key)
+        return versions, response
+
+
+def put_response(key: str, versions: Dict[str, int], body: bytes) -> None:
+    # Least recently used responses are evicted until the cache fits in RESPONSE_CACHE_MAX_BYTES
+    if len(body) > RESPONSE_CACHE_MAX_BYTES:
+        return
+    with _lock:
+        if key in _responses:
+            _evict(key)
+        _responses[key] = (time.monotonic(), versions, body)
+        _cached_bytes["total"] += len(body)
+        while _cached_bytes["total"] > RESPONSE_CACHE_MAX_BYTES:
+            _evict(next(iter(_responses)))
@@ -0,0 +1,141 @@
+import os
+import json
+import fcntl
+import uuid
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+from app.core.config import CHANGELOG_PATH
+
+
+logger = logging.getLogger(__name__)
+
+CHANGE_OPS = ("insert", "update", "delete")
+
+# A new log starts with a header line {"epoch": ..., "version": 0}. Versions only increase within one
+# epoch: if the log is lost and recreated, versions restart from 1 under a new epoch, which tells
+# consumers to resync from since=0 instead of waiting for their old version to come round again.
+
+
+def _last_version(f) -> int:
+    # Version of the last complete line, reading backwards from the end of the file. A last line
+    # without its newline is still being appended by another process and is skipped.
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    chunk = b""
+    while position > 0:
+        step = min(4096, position)
+        position -= step
+        f.seek(position)
+        chunk = f.read(step) + chunk
+        lines = chunk.split(b"\n")[:-1]
+        # The first piece may be cut by the chunk boundary unless the chunk starts the file
+        complete = [line for line in (lines if position == 0 else lines[1:]) if line.strip()]
+        if complete:
+            return _version(complete[-1])
+    return 0
+
+
+def _drop_partial_tail(f):
+    # A writer that died mid-append left a line without its newline: cut it before appending
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size == 0:
+        return
+    f.seek(size - 1)
+    if f.read(1) == b"\n":
+        return
+    position = size
+    while position > 0:
+        step = min(4096, position)
+        position -= step
+        f.seek(position)
+        newline = f.read(step).rfind(b"\n")
+        if newline >= 0:
+            f.truncate(position + newline + 1)
+            return
+    f.truncate(0)
+
+
+def record_changes(changes: Iterable[Tuple[str, str, Any]]) -> int:
+    # Append (op, collection, event id) entries, each with the next version number; returns the latest version.
+    # The file lock makes versions strictly increasing across all workers of the node.
+    changes = list(changes)
+    os.makedirs(os.path.dirname(CHANGELOG_PATH) or ".", exist_ok=True)
+    with open(CHANGELOG_PATH, "a+b") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        _drop_partial_tail(f)
+        version = _last_version(f)
+        if not changes:
+            return version
+        if f.tell() == 0:
+            f.write((json.dumps({"epoch": uuid.uuid4().hex, "version": 0}) + "\n").encode("utf-8"))
+        timestamp = datetime.now(timezone.utc).isoformat()
+        lines = []
+        for op, collection_name, event_id in changes:
+            if op not in CHANGE_OPS:
+                raise ValueError(f"Unknown change operation: {op}")
+            version += 1
+            entry = {"version": version, "op": op, "collection": collection_name, "id": event_id, "ts": timestamp}
+            lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.seek(0, os.SEEK_END)
+        f.write("".join(lines).encode("utf-8"))
+        f.flush()
+    logger.info(f"Recorded {len(changes)} changes up to version {version}")
+    return version
+
+
+def _version(line: bytes) -> int:
+    return json.loads(line)["version"]
+
+
+def _line_at(f, position: int):
+    # (offset, line) of the first line starting at or after position
+    if position > 0:
+        f.seek(position - 1)
+        f.readline()
+    else:
+        f.seek(0)
+    offset = f.tell()
+    return offset, f.readline()
+
+
+def _seek_after(f, since: int) -> int:
+    # Offset of the first line with version > since: binary search over byte positions, since
+    # versions increase with line order
+    f.seek(0, os.SEEK_END)
+    low, high = 0, f.tell()
+    while low < high:
+        middle = (low + high) // 2
+        _, line = _line_at(f, middle)
+        if not line.endswith(b"\n") or _version(line) > since:
+            high = middle
+        else:
+            low = middle + 1
+    return _line_at(f, low)[0]
+
+
+def read_changes(since: int = 0, limit: int = 1000) -> Dict[str, Any]:
+    # Changes with version > since, oldest first, at most limit of them. Blocking: call it from a thread.
+    changes: List[dict] = []
+    latest_version = since
+    epoch = None
+    if os.path.exists(CHANGELOG_PATH):
+        with open(CHANGELOG_PATH, "rb") as f:
+            header = f.readline()
+            epoch = json.loads(header).get("epoch") if header.endswith(b"\n") else None
+            latest_version = _last_version(f)
+            f.seek(_seek_after(f, since))
+            for line in f:
+                # A line still being appended by a writer is left for the next poll
+                if len(changes) >= limit or not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    changes.append(json.loads(line))
+    return {
+        "epoch": epoch,
+        "changes": changes,
+        "latest_version": latest_version,
+        "next_since": changes[-1]["version"] if changes else since,
+    }
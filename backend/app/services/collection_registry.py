@@ -0,0 +1,155 @@
+import time
+import logging
+from typing import Dict, Any, Tuple, Optional
+
+from qdrant_client.http import models as qmodels
+from app.core.config import COLLECTION_REGISTRY_TTL, DENSE_MODEL_NAME, SPARSE_MODEL_NAME, REGIONS
+from app.services import qdrant_client, resilience
+
+
+logger = logging.getLogger(__name__)
+
+# Configured collection names (REGIONS[...]["collection"]) are logical. Which physical collection
+# serves each one, and which embedding models every physical collection was built with, is kept in
+# Qdrant itself, so all workers and nodes agree and nothing is lost with a container:
+# - the Qdrant alias <name> points at the collection serving it (<name>_vN);
+# - a deployment from before aliases still has a real collection <name>; its metadata "served_by"
+#   names the collection serving it until the old one is dropped and the alias can be created;
+# - every collection's metadata "dense_model"/"sparse_model" (collections created before this
+#   metadata existed were built with DENSE_MODEL_NAME/SPARSE_MODEL_NAME).
+# Workers query the physical collection with its own models, so no query ever mixes the two. Lookups
+# read a snapshot that refresh() replaces whole. API workers refresh it in the background every
+# COLLECTION_REGISTRY_TTL seconds (scheduler), so lookups on the event loop never wait for Qdrant and
+# the previous snapshot is served while a refresh is in flight or failing; other processes (CLI)
+# refresh it on the first lookup after the TTL. After an activation a worker may keep reading the
+# previous collection for that long.
+_cache = {"loaded_at": None, "aliases": {}, "metadata": {}, "background": False}
+
+
+def _client():
+    return qdrant_client.qdrant_client
+
+
+def _fetch_metadata(collection_name: str) -> Optional[Dict[str, Any]]:
+    # Metadata of a collection (None if it does not exist)
+    if not _client().collection_exists(collection_name):
+        return None
+    return _client().get_collection(collection_name).config.metadata or {}
+
+
+def refresh():
+    # Reload the aliases and the metadata of every configured collection and of the collection serving it
+    aliases = {alias.alias_name: alias.collection_name for alias in _client().get_aliases().aliases}
+    entries = {}
+    for region in REGIONS.values():
+        name = region["collection"]
+        if name in aliases:
+            physical = aliases[name]
+        else:
+            entries[name] = _fetch_metadata(name)
+            physical = (entries[name] or {}).get("served_by") or name
+        if physical not in entries:
+            entries[physical] = _fetch_metadata(physical)
+    _cache.update(loaded_at=time.monotonic(), aliases=aliases, metadata=entries)
+
+
+def refresh_in_background():
+    # Called once the scheduler refreshes the snapshot periodically: lookups stop refreshing it themselves
+    _cache["background"] = True
+
+
+async def ensure_loaded():
+    # A request arriving before the first snapshot (e.g. Qdrant was down at startup) loads it under
+    # the qdrant limits instead of blocking the event loop
+    if _cache["loaded_at"] is None:
+        await resilience.call("qdrant", refresh)
+
+
+def _expire():
+    loaded_at = _cache["loaded_at"]
+    if loaded_at is not None and (_cache["background"] or time.monotonic() - loaded_at <= COLLECTION_REGISTRY_TTL):
+        return
+    try:
+        refresh()
+    except Exception as e:
+        if loaded_at is None:
+            raise
+        logger.warning(f"Could not refresh the collection registry, using the last known one: {e}")
+        _cache["loaded_at"] = time.monotonic()
+
+
+def _entry(collection_name: str) -> Optional[Dict[str, Any]]:
+    # Collections outside the snapshot (e.g. a reindex target) are read once and kept until the next refresh
+    _expire()
+    if collection_name not in _cache["metadata"]:
+        _cache["metadata"][collection_name] = _fetch_metadata(collection_name)
+    return _cache["metadata"][collection_name]
+
+
+def metadata(collection_name: str) -> Dict[str, Any]:
+    # Metadata of a collection ({} if it does not exist)
+    return _entry(collection_name) or {}
+
+
+def exists(collection_name: str) -> bool:
+    # Whether the collection existed at the last refresh (or was created by this worker since)
+    return _entry(collection_name) is not None
+
+
+def physical_name(collection_name: str) -> str:
+    _expire()
+    aliases = _cache["aliases"]
+    if collection_name in aliases:
+        return aliases[collection_name]
+    return metadata(collection_name).get("served_by") or collection_name
+
+
+def models_for(physical: str) -> Tuple[str, str]:
+    # (dense model, sparse model) the physical collection was built with
+    entry = metadata(physical)
+    return entry.get("dense_model") or DENSE_MODEL_NAME, entry.get("sparse_model") or SPARSE_MODEL_NAME
+
+
+def models_metadata(dense_model: Optional[str] = None, sparse_model: Optional[str] = None) -> Dict[str, Any]:
+    # Metadata recorded on a new collection
+    return {
+        "dense_model": dense_model or DENSE_MODEL_NAME,
+        "sparse_model": sparse_model or SPARSE_MODEL_NAME,
+        "registered_at": time.time(),
+    }
+
+
+def remember(collection_name: str, entry: Optional[Dict[str, Any]]):
+    # Metadata this worker just gave a collection (None: it was deleted), served until the next refresh
+    _cache["metadata"][collection_name] = entry
+
+
+def register(physical: str, dense_model: Optional[str] = None, sparse_model: Optional[str] = None):
+    # Record the models of an existing collection (e.g. one filled by an import)
+    entry = models_metadata(dense_model, sparse_model)
+    _client().update_collection(collection_name=physical, metadata=entry)
+    remember(physical, entry)
+
+
+def activate(collection_name: str, physical: str) -> str:
+    # Point the logical name at another physical collection; returns the previously active one
+    refresh()
+    previous = physical_name(collection_name)
+    aliases = _cache["aliases"]
+    if collection_name in aliases or not _client().collection_exists(collection_name):
+        operations = []
+        if collection_name in aliases:
+            operations.append(qmodels.DeleteAliasOperation(delete_alias=qmodels.DeleteAlias(alias_name=collection_name)))
+        operations.append(
+            qmodels.CreateAliasOperation(create_alias=qmodels.CreateAlias(collection_name=physical, alias_name=collection_name))
+        )
+        # Both operations are applied atomically by Qdrant
+        _client().update_collection_aliases(change_aliases_operations=operations)
+    else:
+        # A pre-alias deployment still has a real collection under the name; it keeps existing
+        # (for rollback) until it is dropped, then activating again creates the alias
+        served_by = "" if physical == collection_name else physical
+        _client().update_collection(collection_name=collection_name, metadata={"served_by": served_by})
+    refresh()
+    logger.info(f"{collection_name} now served by {physical} (was {previous})")
+    return previous
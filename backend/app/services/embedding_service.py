@@ -0,0 +1,104 @@
+import logging
+from typing import List, Optional
+
+import httpx
+from qdrant_client.http import models as qmodels
+from app.core.config import (
+    DENSE_MODEL_NAME,
+    SPARSE_MODEL_NAME,
+    EMBEDDING_SERVICE_SOCKET,
+    EMBEDDING_SERVICE_URL,
+    EMBEDDING_SERVICE_TIMEOUT,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Models are loaded lazily, by name, and shared by every module of the process. A collection is
+# always queried with the models it was built with (see collection_registry), so during a reindex
+# a process may hold the old and the new models side by side.
+_dense_models = {}
+_sparse_models = {}
+_sidecar_client: Optional[httpx.Client] = None
+# Set by use_local_models() in bulk-ingest worker processes
+_force_local = False
+_model_threads: Optional[int] = None
+
+
+def use_local_models(threads: Optional[int] = None):
+    # Embed in this process even if a sidecar is configured, with `threads` ONNX Runtime threads per model
+    global _force_local, _model_threads
+    _force_local = True
+    _model_threads = threads
+
+
+def sidecar_enabled() -> bool:
+    return not _force_local and bool(EMBEDDING_SERVICE_SOCKET or EMBEDDING_SERVICE_URL)
+
+
+def get_dense_model(model_name: Optional[str] = None):
+    model_name = model_name or DENSE_MODEL_NAME
+    if model_name not in _dense_models:
+        from fastembed import TextEmbedding
+        logger.info(f"Loading dense embedding model {model_name}")
+        _dense_models[model_name] = TextEmbedding(model_name, threads=_model_threads)
+    return _dense_models[model_name]
+
+
+def get_sparse_model(model_name: Optional[str] = None):
+    model_name = model_name or SPARSE_MODEL_NAME
+    if model_name not in _sparse_models:
+        from fastembed import SparseTextEmbedding
+        logger.info(f"Loading sparse embedding model {model_name}")
+        _sparse_models[model_name] = SparseTextEmbedding(model_name, threads=_model_threads)
+    return _sparse_models[model_name]
+
+
+def load_models():
+    # Eagerly load both models (used by the sidecar at startup)
+    get_dense_model()
+    get_sparse_model()
+
+
+def _get_sidecar_client() -> httpx.Client:
+    global _sidecar_client
+    if _sidecar_client is None:
+        if EMBEDDING_SERVICE_SOCKET:
+            transport = httpx.HTTPTransport(uds=EMBEDDING_SERVICE_SOCKET)
+            base_url = EMBEDDING_SERVICE_URL or "http://embedder"
+        else:
+            transport = httpx.HTTPTransport()
+            base_url = EMBEDDING_SERVICE_URL
+        _sidecar_client = httpx.Client(transport=transport, base_url=base_url, timeout=EMBEDDING_SERVICE_TIMEOUT)
+    return _sidecar_client
+
+
+def _sidecar_embed(kind: str, texts: List[str], model_name: Optional[str] = None):
+    response = _get_sidecar_client().post("/embed", json={"kind": kind, "texts": texts, "model": model_name})
+    response.raise_for_status()
+    return response.json()["embeddings"]
+
+
+def local_embed_dense(texts: List[str], model_name: Optional[str] = None) -> List[List[float]]:
+    return [emb.tolist() for emb in get_dense_model(model_name).passage_embed(texts)]
+
+
+def local_embed_sparse(texts: List[str], model_name: Optional[str] = None) -> List[qmodels.SparseVector]:
+    return [
+        qmodels.SparseVector(indices=emb.indices.tolist(), values=emb.values.tolist())
+        for emb in get_sparse_model(model_name).passage_embed(texts)
+    ]
+
+
+def embed_dense(texts: List[str], model_name: Optional[str] = None) -> List[List[float]]:
+    # model_name defaults to DENSE_MODEL_NAME
+    if sidecar_enabled():
+        return _sidecar_embed("dense", texts, model_name)
+    return local_embed_dense(texts, model_name)
+
+
+def embed_sparse(texts: List[str], model_name: Optional[str] = None) -> List[qmodels.SparseVector]:
+    # model_name defaults to SPARSE_MODEL_NAME
+    if sidecar_enabled():
+        return [qmodels.SparseVector(**emb) for emb in _sidecar_embed("sparse", texts, model_name)]
+    return local_embed_sparse(texts, model_name)
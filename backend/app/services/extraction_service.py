@@ -3,7 +3,7 @@ from typing import Optional, Literal
 from pydantic import BaseModel, ValidationError, model_validator, Field, field_validator
 from datetime import datetime, timedelta
 from crewai import Agent, Task, Crew, Process, LLM
-from app.core.config import OPENAI_API_KEY, OPEN_AI_BASE_URL, OPENAI_MODEL
+from app.core.config import OPENAI_API_KEY, OPEN_AI_BASE_URL, OPENAI_MODEL, LLM_TIMEOUT
 
 
 
@@ -14,6 +14,8 @@ customllm = LLM(
     base_url=OPEN_AI_BASE_URL,
     api_key=OPENAI_API_KEY,
     temperature=0.0,
+    # The completion itself gives up, so a hung call does not hold its LLM concurrency slot
+    timeout=LLM_TIMEOUT,
 )
 
 
@@ -0,0 +1,78 @@
+import math
+from typing import List, Optional, Tuple
+
+from shapely.geometry import box
+from shapely.prepared import prep
+
+
+# Geohash cells stored per event at several resolutions (approx. 39x20 km, 4.9x4.9 km, 1.2x0.6 km)
+GEOHASH_PRECISIONS = (4, 5, 6)
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_field(precision: int) -> str:
+    return f"geohash_{precision}"
+
+
+def encode(lat: float, lon: float, precision: int) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    # (width in degrees of longitude, height in degrees of latitude)
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = math.floor(5 * precision / 2)
+    return 360.0 / 2 ** lon_bits, 180.0 / 2 ** lat_bits
+
+
+def event_cells(lat: float, lon: float) -> dict:
+    return {geohash_field(p): encode(lat, lon, p) for p in GEOHASH_PRECISIONS}
+
+
+def _grid_span(bounds, precision: int):
+    min_lon, min_lat, max_lon, max_lat = bounds
+    width, height = cell_size(precision)
+    cols = range(math.floor((min_lon + 180) / width), math.floor((max_lon + 180) / width) + 1)
+    rows = range(math.floor((min_lat + 90) / height), math.floor((max_lat + 90) / height) + 1)
+    return cols, rows, width, height
+
+
+def covering_cells(polygon, precision: int) -> List[str]:
+    # Geohash cells at `precision` intersecting the polygon (lon/lat coordinates)
+    cols, rows, width, height = _grid_span(polygon.bounds, precision)
+    prepared = prep(polygon)
+    cells = []
+    for col in cols:
+        for row in rows:
+            min_lon, min_lat = col * width - 180, row * height - 90
+            if prepared.intersects(box(min_lon, min_lat, min_lon + width, min_lat + height)):
+                cells.append(encode(min_lat + height / 2, min_lon + width / 2, precision))
+    return cells
+
+
+def choose_covering(polygon, max_cells: int) -> Optional[Tuple[str, List[str]]]:
+    # Finest stored resolution whose covering stays within max_cells, as (payload field, cells)
+    for precision in sorted(GEOHASH_PRECISIONS, reverse=True):
+        cols, rows, _, _ = _grid_span(polygon.bounds, precision)
+        if len(cols) * len(rows) > max_cells * 4:
+            continue  # bounding grid far too large, don't even test intersections
+        cells = covering_cells(polygon, precision)
+        if len(cells) <= max_cells:
+            return geohash_field(precision), cells
+    return None
@@ -0,0 +1,69 @@
+from typing import List, Optional
+
+from shapely.geometry import LineString, Polygon
+
+
+def encode_polyline(coords, precision: int = 5) -> str:
+    # Google encoded polyline of [lon, lat] coordinates (encoded in lat, lon order as the format expects)
+    factor = 10 ** precision
+    encoded = []
+    prev_lat = prev_lon = 0
+    for lon, lat in coords:
+        lat_i, lon_i = round(lat * factor), round(lon * factor)
+        for delta in (lat_i - prev_lat, lon_i - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                encoded.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            encoded.append(chr(value + 63))
+        prev_lat, prev_lon = lat_i, lon_i
+    return "".join(encoded)
+
+
+def quantize(coords, precision: Optional[int]) -> List[List[float]]:
+    if precision is None:
+        return [list(c) for c in coords]
+    return [[round(lon, precision), round(lat, precision)] for lon, lat in coords]
+
+
+def zoom_tolerance(zoom: int) -> float:
+    # Width of one 256 px tile pixel in degrees of longitude at this web map zoom level
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def simplify_coords(coords, zoom: Optional[int], closed: bool = False):
+    if zoom is None or len(coords) < 3:
+        return coords
+    geometry = Polygon(coords) if closed else LineString(coords)
+    simplified = geometry.simplify(zoom_tolerance(zoom), preserve_topology=True)
+    line = simplified.exterior if closed else simplified
+    return [list(c) for c in line.coords]
+
+
+def encode_geometry(response: dict, geometry_format: str, precision: Optional[int], simplify_zoom: Optional[int]) -> dict:
+    # Replace route_coords / buffer_polygon of a create_map response with the requested compact form
+    if "route_coords" not in response:
+        return response
+    route = simplify_coords(response["route_coords"], simplify_zoom)
+    buffer = simplify_coords(response["buffer_polygon"], simplify_zoom, closed=True)
+
+    if geometry_format == "polyline":
+        response["route_coords"] = encode_polyline(route, 5 if precision is None else precision)
+        response["buffer_polygon"] = encode_polyline(buffer, 5 if precision is None else precision)
+    elif geometry_format == "geojson":
+        del response["route_coords"]
+        del response["buffer_polygon"]
+        response["geojson"] = {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "properties": {"kind": "route"},
+                 "geometry": {"type": "LineString", "coordinates": quantize(route, precision)}},
+                {"type": "Feature", "properties": {"kind": "buffer"},
+                 "geometry": {"type": "Polygon", "coordinates": [quantize(buffer, precision)]}},
+            ],
+        }
+    else:
+        response["route_coords"] = quantize(route, precision)
+        response["buffer_polygon"] = quantize(buffer, precision)
+    response["geometry_format"] = geometry_format
+    return response
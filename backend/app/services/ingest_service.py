@@ -1,17 +1,21 @@
 import os
 import json
 import asyncio
+import time
 import hashlib
 import logging
-from uuid import uuid4
-from typing import Optional, Dict, Any
+from uuid import uuid5, NAMESPACE_URL
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Iterable
 
 import httpx
 from dotenv import load_dotenv
 from tqdm import tqdm
-from fastembed import TextEmbedding, SparseTextEmbedding
 from qdrant_client import QdrantClient, models
-from app.core.config import QDRANT_SERVER, QDRANT_API_KEY, DENSE_MODEL_NAME, SPARSE_MODEL_NAME
+from app.core.config import QDRANT_SERVER, QDRANT_API_KEY, COLLECTION_NAME, QDRANT_INGEST_TIMEOUT
+from app.services import embedding_service, region_router, cache_service, change_log, collection_registry
+from app.services.temporal_buckets import week_buckets_between
+from app.services.geo_cells import GEOHASH_PRECISIONS, geohash_field, event_cells
 
 
 # Initialize logging
@@ -23,14 +27,14 @@ logger = logging.getLogger(__name__)
 if not QDRANT_SERVER or not QDRANT_API_KEY:
     raise EnvironmentError("QDRANT_SERVER or QDRANT_API_KEY not defined in .env file")
 
-# Initialize embedding models once
-dense_embedding_model = TextEmbedding(DENSE_MODEL_NAME)
-sparse_embedding_model = SparseTextEmbedding(SPARSE_MODEL_NAME)
-client = QdrantClient(url=QDRANT_SERVER, api_key=QDRANT_API_KEY, timeout=200000)
+client = QdrantClient(url=QDRANT_SERVER, api_key=QDRANT_API_KEY, timeout=QDRANT_INGEST_TIMEOUT)
 
-COLLECTION_NAME = "veneto_events"
 DENSE_VECTOR_NAME = "dense_vector"
 SPARSE_VECTOR_NAME = "sparse_vector"
+# Bump when derived payload fields change so unchanged events are rewritten on the next ingest
+PAYLOAD_VERSION = 3
+ARCHIVE_SUFFIX = "_archive"
+POINT_ID_NAMESPACE = uuid5(NAMESPACE_URL, "remap/events")
 
 
 async def async_geocode_structured(
@@ -58,37 +62,76 @@ async def async_geocode_structured(
     return None
 
 
+async def geocode_events(events: List[Dict[str, Any]], concurrency: int = 5):
+    # Fill location.latitude/longitude in place (None when the venue cannot be resolved)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def geocode_event(event):
+        event.setdefault("location", {})
+        venue = event["location"].get("venue", "").strip()
+        city = event.get("city", "").strip()
+        if venue and city:
+            async with semaphore:
+                coords = await async_geocode_structured(venue, city)
+            if coords:
+                event["location"]["latitude"] = coords["lat"]
+                event["location"]["longitude"] = coords["lon"]
+            else:
+                event["location"]["latitude"] = None
+                event["location"]["longitude"] = None
+        else:
+            event["location"]["latitude"] = None
+            event["location"]["longitude"] = None
+
+    await asyncio.gather(*(geocode_event(event) for event in events))
+
+
 def calculate_hash(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
-def ensure_collection_exists():
-    # Create collection if it does not exist
-    example_text = "Test for embedding dimension calculation."
-    dense_emb = list(dense_embedding_model.passage_embed([example_text]))[0]
-    dense_dim = len(dense_emb)
-    if not client.collection_exists(COLLECTION_NAME):
-        logger.info(f"Creating collection {COLLECTION_NAME} with dimension {dense_dim}")
+def ensure_collection_exists(
+    collection_name: str = COLLECTION_NAME,
+    dense_dim: Optional[int] = None,
+    dense_model: Optional[str] = None,
+    sparse_model: Optional[str] = None,
+):
+    # Create collection if it does not exist, recording the models it is built with in its metadata
+    # (default: the collection's current models). dense_dim defaults to the dense model's dimension.
+    default_dense, default_sparse = collection_registry.models_for(collection_name)
+    dense_model = dense_model or default_dense
+    sparse_model = sparse_model or default_sparse
+    if dense_dim is None:
+        example_text = "Test for embedding dimension calculation."
+        dense_emb = embedding_service.embed_dense([example_text], dense_model)[0]
+        dense_dim = len(dense_emb)
+    if not client.collection_exists(collection_name):
+        logger.info(f"Creating collection {collection_name} with dimension {dense_dim}")
+        entry = collection_registry.models_metadata(dense_model, sparse_model)
         client.create_collection(
-            collection_name=COLLECTION_NAME,
+            collection_name=collection_name,
             vectors_config={
                 DENSE_VECTOR_NAME: models.VectorParams(size=dense_dim, distance=models.Distance.COSINE),
             },
             sparse_vectors_config={
                 SPARSE_VECTOR_NAME: models.SparseVectorParams(),
-            }
+            },
+            metadata=entry,
         )
+        collection_registry.remember(collection_name, entry)
     # Create payload indexes if they don't exist (safe to call repeatedly)
     payload_indices = {
         "id": "keyword",
         "location": "geo",
         "start_date": "datetime",
-        "end_date": "datetime"
+        "end_date": "datetime",
+        "week_buckets": "integer",
+        **{geohash_field(p): "keyword" for p in GEOHASH_PRECISIONS},
     }
     for field_name, field_schema in payload_indices.items():
         try:
             client.create_payload_index(
-                collection_name=COLLECTION_NAME,
+                collection_name=collection_name,
                 field_name=field_name,
                 field_schema=field_schema,
             )
@@ -96,54 +139,122 @@ def ensure_collection_exists():
             logger.debug(f"Payload index for {field_name} might already exist or error: {e}")
 
 
-async def ingest_events_from_file(json_path: str) -> Dict[str, Any]:
-    logger.info(f"Loading events from {json_path}")
-    with open(json_path, "r", encoding="utf-8") as f:
-        events_data = json.load(f)
-
-    events = events_data.get("events", [])
-
-    semaphore = asyncio.Semaphore(5)
-
-    async def geocode_event(event):
-        venue = event.get("location", {}).get("venue", "").strip()
-        city = event.get("city", "").strip()
-        if venue and city:
-            async with semaphore:
-                coords = await async_geocode_structured(venue, city)
-            if coords:
-                event["location"]["latitude"] = coords["lat"]
-                event["location"]["longitude"] = coords["lon"]
-            else:
-                event["location"]["latitude"] = None
-                event["location"]["longitude"] = None
-        else:
-            event["location"]["latitude"] = None
-            event["location"]["longitude"] = None
+def embed_for_collections(texts: List[str], collection_names: List[str]):
+    # Dense and sparse embeddings of texts[i] with the models of collection_names[i]
+    dense, sparse = [None] * len(texts), [None] * len(texts)
+    by_models = {}
+    for i, collection_name in enumerate(collection_names):
+        by_models.setdefault(collection_registry.models_for(collection_name), []).append(i)
+    for (dense_model, sparse_model), indices in by_models.items():
+        group = [texts[i] for i in indices]
+        for i, d, s in zip(
+            indices, embedding_service.embed_dense(group, dense_model), embedding_service.embed_sparse(group, sparse_model)
+        ):
+            dense[i], sparse[i] = d, s
+    return dense, sparse
+
+
+def point_id(event_id: Any) -> str:
+    # Deterministic point id, so re-ingesting an event (or a resumed bulk shard) overwrites instead of duplicating
+    return str(uuid5(POINT_ID_NAMESPACE, str(event_id)))
+
+
+def prefilter_fields(start_date, end_date, lat=None, lon=None) -> Dict[str, Any]:
+    # Coarse temporal prefilter: every calendar week the event is active in
+    fields = {}
+    week_buckets = week_buckets_between(start_date, end_date)
+    if week_buckets is not None:
+        fields["week_buckets"] = week_buckets
+    # Coarse spatial prefilter: geohash cell of the event at each stored resolution
+    if lat is not None and lon is not None:
+        fields.update(event_cells(lat, lon))
+    return fields
+
+
+def build_payload(event: Dict[str, Any], chunk_hash: str) -> Dict[str, Any]:
+    loc = event.get("location", {})
+    loc_geo = {}
+    if "latitude" in loc and "longitude" in loc:
+        loc_geo = {"lat": loc["latitude"], "lon": loc["longitude"]}
+
+    location_payload = {**loc, **loc_geo}  # Merges original location dict with lat/lon keys
+
+    payload = {**event, "location": location_payload, "hash": chunk_hash, "payload_version": PAYLOAD_VERSION}
+
+    payload.update(prefilter_fields(event.get("start_date"), event.get("end_date"), loc_geo.get("lat"), loc_geo.get("lon")))
+    return payload
+
+
+def build_point(event: Dict[str, Any], chunk_hash: str, dense_embedding, sparse_embedding) -> models.PointStruct:
+    return models.PointStruct(
+        id=point_id(event["id"]),
+        vector={
+            DENSE_VECTOR_NAME: dense_embedding,
+            SPARSE_VECTOR_NAME: sparse_embedding,
+        },
+        payload=build_payload(event, chunk_hash),
+    )
+
+
+def existing_points(collection_name: str, event_ids: List[Any]) -> Dict[Any, List[models.Record]]:
+    # Stored points of the given events, keyed by payload id (one scroll for the whole batch)
+    event_ids = [event_id for event_id in event_ids if event_id]
+    found = {}
+    if not event_ids:
+        return found
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=models.Filter(
+                must=[models.FieldCondition(key="id", match=models.MatchAny(any=event_ids))]
+            ),
+            limit=max(len(event_ids), 64),
+            offset=offset,
+            with_payload=["id", "hash", "payload_version"],
+            with_vectors=False,
+        )
+        for p in points:
+            found.setdefault(p.payload.get("id"), []).append(p)
+        if offset is None:
+            break
+    return found
 
-    logger.info("Geocoding events asynchronously")
-    await asyncio.gather(*(geocode_event(event) for event in events))
 
-    geocoded_path = os.path.splitext(json_path)[0] + "_geocoded_structured.json"
-    logger.info(f"Saving geocoded events to {geocoded_path}")
-    with open(geocoded_path, "w", encoding="utf-8") as f:
-        json.dump(events_data, f, ensure_ascii=False, indent=2)
+def is_unchanged(points: List[models.Record], chunk_hash: str) -> bool:
+    # A single stored copy with the same text hash and payload version needs no rewrite
+    return (
+        len(points) == 1
+        and points[0].payload.get("hash", "") == chunk_hash
+        and points[0].payload.get("payload_version") == PAYLOAD_VERSION
+    )
 
-    ensure_collection_exists()
 
+def write_events(events: List[Dict[str, Any]], event_collections: List[str]) -> Dict[str, Any]:
+    # Embed and upsert events[i] into event_collections[i], skipping unchanged ones; changes are
+    # published to the change log and the response cache only once their upsert succeeded
     BATCH_SIZE = 32
     inserted = 0
     updated = 0
     skipped_unchanged = 0
+    failed = 0
+    changed_collections = set()
+    changes = []
 
     for start in tqdm(range(0, len(events), BATCH_SIZE)):
         batch = events[start : start + BATCH_SIZE]
         texts = [event.get("description", "") for event in batch]
-        dense_embeddings = list(dense_embedding_model.passage_embed(texts))
-        sparse_embeddings = list(sparse_embedding_model.passage_embed(texts))
-        points = []
+        existing_by_collection = {
+            collection_name: existing_points(
+                collection_name,
+                [e.get("id") for j, e in enumerate(batch) if event_collections[start + j] == collection_name],
+            )
+            for collection_name in set(event_collections[start : start + BATCH_SIZE])
+        }
+        to_write = []
 
         for i, event in enumerate(batch):
+            collection_name = event_collections[start + i]
             event_id = event.get("id")
             if not event_id:
                 logger.warning(f"Skipping event without id: {event}")
@@ -151,64 +262,304 @@ async def ingest_events_from_file(json_path: str) -> Dict[str, Any]:
             text = texts[i]
             chunk_hash = calculate_hash(text)
 
-            existing_points, _ = client.scroll(
-                collection_name=COLLECTION_NAME,
-                scroll_filter=models.Filter(
-                    must=[models.FieldCondition(key="id", match=models.MatchValue(value=event_id))]
-                ),
-                limit=1,
-            )
+            existing = existing_by_collection[collection_name].get(event_id, [])
+            new_id = point_id(event_id)
 
-            if existing_points:
-                existing_point = existing_points[0]
-                existing_hash = existing_point.payload.get("hash", "")
-                if existing_hash == chunk_hash:
-                    skipped_unchanged += 1
-                    continue
-                else:
-                    client.delete(
-                        collection_name=COLLECTION_NAME,
-                        points_selector=models.PointIdsList(points=[existing_point.id]),
-                    )
+            if existing and is_unchanged(existing, chunk_hash):
+                skipped_unchanged += 1
+                continue
+            to_write.append((i, chunk_hash, "update" if existing else "insert", [p.id for p in existing if str(p.id) != new_id]))
+
+        # Only new and changed events are embedded
+        dense_embeddings, sparse_embeddings = embed_for_collections(
+            [texts[i] for i, _, _, _ in to_write], [event_collections[start + i] for i, _, _, _ in to_write]
+        )
+        # collection -> (points, [(op, event id, stale point ids)])
+        writes_by_collection = {}
+        for (i, chunk_hash, op, stale_ids), dense, sparse in zip(to_write, dense_embeddings, sparse_embeddings):
+            points, writes = writes_by_collection.setdefault(event_collections[start + i], ([], []))
+            points.append(build_point(batch[i], chunk_hash, dense, sparse))
+            writes.append((op, batch[i]["id"], stale_ids))
+
+        for collection_name, (points, writes) in writes_by_collection.items():
+            try:
+                client.upsert(collection_name=collection_name, points=points, wait=True)
+            except Exception as e:
+                logger.error(f"Error uploading points batch to {collection_name}: {e}")
+                failed += len(points)
+                continue
+            # Older copies under other point ids are removed only once the new point is stored
+            stale_ids = [stale for _, _, ids in writes for stale in ids]
+            if stale_ids:
+                client.delete(
+                    collection_name=collection_name,
+                    points_selector=models.PointIdsList(points=stale_ids),
+                )
+            for op, event_id, _ in writes:
+                if op == "update":
                     updated += 1
-            else:
-                inserted += 1
+                else:
+                    inserted += 1
+                changes.append((op, collection_name, event_id))
+            changed_collections.add(collection_name)
 
-            loc = event.get("location", {})
-            loc_geo = {}
-            if "latitude" in loc and "longitude" in loc:
-                loc_geo = {"lat": loc["latitude"], "lon": loc["longitude"]}
+    # Publish the change feed and invalidate cached /create_map responses that read these collections
+    change_log.record_changes(changes)
+    cache_service.bump_collection_versions(changed_collections)
 
-            location_payload = {**loc, **loc_geo}  # Merges original location dict with lat/lon keys
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "skipped_unchanged": skipped_unchanged,
+        "failed": failed,
+    }
 
-            payload = {**event, "location": location_payload, "hash": chunk_hash}
 
+async def ingest_events_from_file(json_path: str, sync: bool = False) -> Dict[str, Any]:
+    # sync=True treats the file as the complete feed: events whose id is missing from it are deleted
+    logger.info(f"Loading events from {json_path}")
+    with open(json_path, "r", encoding="utf-8") as f:
+        events_data = json.load(f)
 
-            points.append(
-                models.PointStruct(
-                    id=str(uuid4()),
-                    vector={
-                        DENSE_VECTOR_NAME: dense_embeddings[i].tolist(),
-                        SPARSE_VECTOR_NAME: models.SparseVector(
-                            indices=list(sparse_embeddings[i].indices),
-                            values=list(sparse_embeddings[i].values),
-                        ),
-                    },
-                    payload=payload,
-                )
-            )
+    events = events_data.get("events", [])
+    if sync and not any(event.get("id") for event in events):
+        raise ValueError("Refusing to sync: the feed contains no event ids")
 
-        if points:
-            try:
-                client.upsert(collection_name=COLLECTION_NAME, points=points, wait=True)
-            except Exception as e:
-                logger.error(f"Error uploading points batch: {e}")
+    logger.info("Geocoding events asynchronously")
+    await geocode_events(events)
 
-    collection_info = client.get_collection(COLLECTION_NAME)
-    logger.info(f"Ingestion complete: inserted={inserted}, updated={updated}, skipped={skipped_unchanged}")
+    geocoded_path = os.path.splitext(json_path)[0] + "_geocoded_structured.json"
+    logger.info(f"Saving geocoded events to {geocoded_path}")
+    with open(geocoded_path, "w", encoding="utf-8") as f:
+        json.dump(events_data, f, ensure_ascii=False, indent=2)
+
+    # Embedding and Qdrant calls block: they run in a thread so the event loop keeps serving requests
+    written, current_collections = await asyncio.to_thread(_write_and_replay, events)
+
+    deleted = {}
+    if sync:
+        # The feed is complete only for the regions it covers: other regions' collections are left alone
+        deleted = await asyncio.to_thread(
+            delete_missing_events, (event.get("id") for event in events), set(current_collections)
+        )
+
+    collection_info = await asyncio.to_thread(
+        lambda: {name: client.get_collection(name) for name in sorted(set(current_collections))}
+    )
+    logger.info(
+        f"Ingestion complete: inserted={written['inserted']}, updated={written['updated']}, "
+        f"skipped={written['skipped_unchanged']}, failed={written['failed']}, "
+        f"deleted={sum(deleted.values())}"
+    )
     return {
-        "inserted": inserted,
-        "updated": updated,
-        "skipped_unchanged": skipped_unchanged,
+        **written,
+        "deleted": deleted,
         "collection_info": collection_info,
     }
+
+
+def _write_and_replay(events: List[Dict[str, Any]]):
+    # Route every event to the collection of its region
+    event_collections = [region_router.collection_for_event(event) for event in events]
+    for collection_name in set(event_collections):
+        ensure_collection_exists(collection_name)
+
+    written = write_events(events, event_collections)
+
+    # A reindex may have activated another collection for a region while this ingest was writing
+    # (the change log only gets these writes now, possibly after its catch-up): replay the events
+    # on the collection serving their region now. Copies already caught up are unchanged and skipped.
+    collection_registry.refresh()
+    current_collections = [region_router.collection_for_event(event) for event in events]
+    moved = [i for i, name in enumerate(current_collections) if name != event_collections[i]]
+    if moved:
+        logger.info(f"Replaying {len(moved)} events on collections activated during the ingest")
+        for collection_name in {current_collections[i] for i in moved}:
+            ensure_collection_exists(collection_name)
+        write_events([events[i] for i in moved], [current_collections[i] for i in moved])
+
+    return written, current_collections
+
+
+def _collect_event_ids(collection_name: str, points_filter: models.Filter, batch_size: int = 1024) -> List[Any]:
+    # Payload ids of every point matching the filter (ids only, no vectors)
+    event_ids = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=points_filter,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["id"],
+            with_vectors=False,
+        )
+        event_ids.extend(p.payload.get("id") for p in points)
+        if offset is None:
+            break
+    return event_ids
+
+
+def _delete_matching(points_filter: models.Filter, collection_names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    # One filtered delete per collection (default: every region collection); deleted ids go to the change log
+    deleted = {}
+    for collection_name in collection_names or region_router.all_collections():
+        if not client.collection_exists(collection_name):
+            continue
+        event_ids = _collect_event_ids(collection_name, points_filter)
+        if event_ids:
+            client.delete(
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(filter=points_filter),
+                wait=True,
+            )
+            change_log.record_changes(("delete", collection_name, event_id) for event_id in event_ids)
+        deleted[collection_name] = len(event_ids)
+    cache_service.bump_collection_versions(name for name, count in deleted.items() if count)
+    return deleted
+
+
+def delete_missing_events(feed_ids: Iterable[Any], collection_names: Iterable[str]) -> Dict[str, int]:
+    # Delete events of the given collections whose id is not in the feed
+    feed_ids = sorted({event_id for event_id in feed_ids if event_id})
+    collection_names = sorted(collection_names)
+    if not feed_ids or not collection_names:
+        # An empty feed would wipe every collection, which is never what a sync means
+        raise ValueError("Refusing to sync: the feed contains no event ids")
+    missing_filter = models.Filter(
+        must_not=[models.FieldCondition(key="id", match=models.MatchAny(any=feed_ids))]
+    )
+    deleted = _delete_matching(missing_filter, collection_names)
+    logger.info(f"Sync deleted {sum(deleted.values())} events missing from the feed")
+    return deleted
+
+
+def expiry_cutoff(before: Optional[datetime] = None) -> datetime:
+    # Expiry only ever removes events that have ended: a cutoff in the future is refused
+    now = datetime.now(timezone.utc)
+    if before is None:
+        return now
+    if before.tzinfo is None:
+        before = before.replace(tzinfo=timezone.utc)
+    if before > now:
+        raise ValueError(f"before={before.isoformat()} is in the future")
+    return before
+
+
+def _expired_filter(before: datetime) -> models.Filter:
+    return models.Filter(
+        must=[models.FieldCondition(key="end_date", range=models.DatetimeRange(lt=before))]
+    )
+
+
+def expire_events(mode: str = "delete", before: Optional[datetime] = None) -> Dict[str, Any]:
+    # Remove (mode="delete", one filtered delete per collection) or archive events whose end_date has passed
+    started = time.perf_counter()
+    before = expiry_cutoff(before)
+    if mode == "archive":
+        removed = archive_expired_events(before)["archived"]
+    elif mode == "delete":
+        removed = _delete_matching(_expired_filter(before))
+    else:
+        raise ValueError(f"Unknown expiry mode: {mode}")
+    duration = time.perf_counter() - started
+    logger.info(f"Expiry ({mode}) removed {sum(removed.values())} events in {duration:.2f}s")
+    return {
+        "mode": mode,
+        "before": before.isoformat(),
+        "removed": removed,
+        "total_removed": sum(removed.values()),
+        "duration_seconds": round(duration, 3),
+    }
+
+
+def archive_expired_events(before: Optional[datetime] = None, batch_size: int = 256) -> Dict[str, Any]:
+    # Move events whose end_date is before `before` (default now) into each region's archive collection
+    before = expiry_cutoff(before)
+    expired_filter = _expired_filter(before)
+
+    archived = {}
+    for collection_name in region_router.all_collections():
+        if not client.collection_exists(collection_name):
+            continue
+        archive_name = collection_name + ARCHIVE_SUFFIX
+        source_dim = client.get_collection(collection_name).config.params.vectors[DENSE_VECTOR_NAME].size
+        # Archived vectors keep the source collection's models, which the archive records too
+        dense_model, sparse_model = collection_registry.models_for(collection_name)
+        ensure_collection_exists(archive_name, dense_dim=source_dim, dense_model=dense_model, sparse_model=sparse_model)
+        archived[collection_name] = 0
+        offset = None
+        while True:
+            expired_points, offset = client.scroll(
+                collection_name=collection_name,
+                scroll_filter=expired_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if not expired_points:
+                break
+            client.upsert(
+                collection_name=archive_name,
+                points=[models.PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in expired_points],
+                wait=True,
+            )
+            # Delete exactly what was copied, so events ingested meanwhile are never lost
+            client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=[p.id for p in expired_points]),
+            )
+            change_log.record_changes(("delete", collection_name, p.payload.get("id")) for p in expired_points)
+            archived[collection_name] += len(expired_points)
+            if offset is None:
+                break
+        logger.info(f"Archived {archived[collection_name]} events from {collection_name} to {archive_name}")
+
+    cache_service.bump_collection_versions(name for name, count in archived.items() if count)
+
+    return {"archived": archived, "before": before.isoformat()}
+
+
+def backfill_prefilter_fields(collection_names: Optional[Iterable[str]] = None, batch_size: int = 256) -> Dict[str, Any]:
+    # Add the prefilter payload fields to points ingested before they existed, in place and without
+    # re-embedding (one batched set_payload per page). Run it before enabling TEMPORAL_PREFILTER or
+    # GEO_PREFILTER: the prefilters drop points without these fields.
+    missing_filter = models.Filter(
+        should=[
+            models.IsEmptyCondition(is_empty=models.PayloadField(key=key))
+            for key in ["week_buckets", *(geohash_field(p) for p in GEOHASH_PRECISIONS)]
+        ]
+    )
+    updated = {}
+    for collection_name in collection_names or region_router.all_collections():
+        if not client.collection_exists(collection_name):
+            continue
+        updated[collection_name] = 0
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                scroll_filter=missing_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["start_date", "end_date", "location"],
+                with_vectors=False,
+            )
+            operations = []
+            for p in points:
+                location = p.payload.get("location") or {}
+                fields = prefilter_fields(
+                    p.payload.get("start_date"), p.payload.get("end_date"), location.get("lat"), location.get("lon")
+                )
+                if fields:
+                    operations.append(models.SetPayloadOperation(set_payload=models.SetPayload(payload=fields, points=[p.id])))
+            if operations:
+                client.batch_update_points(collection_name=collection_name, update_operations=operations, wait=True)
+                updated[collection_name] += len(operations)
+            if offset is None:
+                break
+        logger.info(f"Backfilled prefilter fields on {updated[collection_name]} points of {collection_name}")
+
+    cache_service.bump_collection_versions(name for name, count in updated.items() if count)
+    return {"updated": updated}
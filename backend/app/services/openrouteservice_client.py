@@ -1,12 +1,41 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
 import openrouteservice
-from app.core.config import OPENROUTE_API_KEY
+from openrouteservice.exceptions import ApiError
+from app.core.config import OPENROUTE_API_KEY, ORS_TIMEOUT, GEOCODE_CACHE_SIZE, GEOCODE_CACHE_TTL
+from app.services import resilience
+
+
+logger = logging.getLogger(__name__)
+
+# retry_over_query_limit would sleep and retry inside the call, past any request deadline
+ors_client = openrouteservice.Client(key=OPENROUTE_API_KEY, timeout=ORS_TIMEOUT, retry_over_query_limit=False)
+
+# address -> (cached_at, coordinates)
+_geocodes: "OrderedDict[str, tuple]" = OrderedDict()
+_geocodes_lock = threading.Lock()
+
 
+class ORSRequestError(ValueError):
+    # ORS rejected the request itself (4xx other than 429, e.g. no routable point, route too long).
+    # Being a ValueError it is a caller error for the breaker; 5xx and 429 stay ApiError failures.
+    pass
 
-ors_client = openrouteservice.Client(key=OPENROUTE_API_KEY)
+
+def is_client_error(e: ApiError) -> bool:
+    return isinstance(e.status, int) and e.status < 500 and e.status != 429
 
 
 def geocode_address(address: str):
-    geocode_result = ors_client.pelias_search(text=address)
+    try:
+        geocode_result = ors_client.pelias_search(text=address)
+    except ApiError as e:
+        if is_client_error(e):
+            raise ORSRequestError(str(e)) from e
+        raise
     if geocode_result and 'features' in geocode_result and len(geocode_result['features']) > 0:
         coords = geocode_result['features'][0]['geometry']['coordinates']
         return tuple(coords)
@@ -15,5 +44,40 @@ def geocode_address(address: str):
 
 
 
-def get_route(coords, profile, radiuses=[1000, 1000]):
-    return ors_client.directions(coordinates=coords, profile=profile, radiuses=radiuses, format='geojson')
+def get_route(coords, profile, radiuses=None):
+    # One snapping radius per waypoint (origin, intermediate stops, destination)
+    if radiuses is None:
+        radiuses = [1000] * len(coords)
+    try:
+        return ors_client.directions(coordinates=coords, profile=profile, radiuses=radiuses, format='geojson')
+    except ApiError as e:
+        if is_client_error(e):
+            raise ORSRequestError(str(e)) from e
+        raise
+
+
+async def geocode(address: str):
+    # Cached, guarded geocoding: a stale cached result is served while ORS is failing or its circuit is open
+    with _geocodes_lock:
+        cached = _geocodes.get(address)
+    if cached is not None and time.monotonic() - cached[0] < GEOCODE_CACHE_TTL:
+        return cached[1]
+    try:
+        coords = await resilience.call("ors", geocode_address, address, ignore=(ValueError,))
+    except ValueError:
+        raise
+    except Exception as e:
+        if cached is None:
+            raise
+        logger.warning(f"Serving stale geocode for {address!r}: {e}")
+        return cached[1]
+    with _geocodes_lock:
+        _geocodes[address] = (time.monotonic(), coords)
+        _geocodes.move_to_end(address)
+        while len(_geocodes) > GEOCODE_CACHE_SIZE:
+            _geocodes.popitem(last=False)
+    return coords
+
+
+async def route(coords, profile, radiuses=None):
+    return await resilience.call("ors", get_route, coords, profile, radiuses, ignore=(ValueError,))
@@ -1,9 +1,12 @@
+import asyncio
+
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qmodels
-from app.core.config import QDRANT_SERVER, QDRANT_API_KEY, COLLECTION_NAME
+from app.core.config import QDRANT_SERVER, QDRANT_API_KEY, COLLECTION_NAME, QDRANT_TIMEOUT
+from app.services import resilience
 
 
-qdrant_client = QdrantClient(url=QDRANT_SERVER, api_key=QDRANT_API_KEY, timeout=2000000)
+qdrant_client = QdrantClient(url=QDRANT_SERVER, api_key=QDRANT_API_KEY, timeout=QDRANT_TIMEOUT)
 
 
 def query_events(polygon_coords_qdrant, query_filter=None, collection_name=COLLECTION_NAME, limit=100):
@@ -28,41 +31,175 @@ def query_events(polygon_coords_qdrant, query_filter=None, collection_name=COLLE
     return [p.payload for p in results.points]
 
 
-def query_events_hybrid(dense_vector, sparse_vector, query_filter, collection_name=COLLECTION_NAME, limit=100, score_threshold=0.0):
-    results = qdrant_client.query_points(
-        collection_name=collection_name,
-        prefetch=[
-            qmodels.Prefetch(
-                query=qmodels.SparseVector(
-                    indices=list(sparse_vector.indices),
-                    values=list(sparse_vector.values)
-                ),
-                using="sparse_vector",
-                limit=50,
-                # score_threshold=score_threshold,  # Optional: filter out low-score results but I don't need for sparse
+def hybrid_prefetch(dense_vector, sparse_vector, score_threshold=0.0, limit=50):
+    # Each branch must return at least as many candidates as the fused page reaches (offset + limit)
+    return [
+        qmodels.Prefetch(
+            query=qmodels.SparseVector(
+                indices=list(sparse_vector.indices),
+                values=list(sparse_vector.values)
             ),
-            qmodels.Prefetch(
-                query=dense_vector,
-                using="dense_vector",
-                limit=50,
-                score_threshold=score_threshold,  # Optional: filter out low-score results
-            ),
-        ],
-        query=qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
-        query_filter=query_filter,
-        limit=limit,
-        with_payload=True,
-        # score_threshold=score_threshold,  # Optional: filter out low-score results
-    )
+            using="sparse_vector",
+            limit=max(50, limit),
+            # score_threshold=score_threshold,  # Optional: filter out low-score results but I don't need for sparse
+        ),
+        qmodels.Prefetch(
+            query=dense_vector,
+            using="dense_vector",
+            limit=max(50, limit),
+            score_threshold=score_threshold,  # Optional: filter out low-score results
+        ),
+    ]
 
-    # Process results into dataframe
+
+def to_records(points):
     records = []
-    for point in results.points:
+    for point in points:
         entry = dict(point.payload)
         entry["score"] = point.score
         records.append(entry)
-    
-    #return [p.payload for p in results.points]
     return records
-#    return [{"payload": p.payload, "score": p.score} for p in results.points]
 
+
+def search_arguments(mode, dense_vector, sparse_vector, score_threshold=0.0, limit=100, offset=0):
+    # Query arguments of each search mode, shared by query_points and QueryRequest:
+    # "hybrid" fuses a sparse and a dense prefetch with RRF, "sparse"/"dense" run a single vector query
+    if mode == "sparse":
+        return {
+            "query": qmodels.SparseVector(indices=list(sparse_vector.indices), values=list(sparse_vector.values)),
+            "using": "sparse_vector",
+        }
+    if mode == "dense":
+        return {"query": dense_vector, "using": "dense_vector", "score_threshold": score_threshold}
+    return {
+        "prefetch": hybrid_prefetch(dense_vector, sparse_vector, score_threshold, limit=offset + limit),
+        "query": qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
+    }
+
+
+def query_events_hybrid(dense_vector, sparse_vector, query_filter, collection_name=COLLECTION_NAME, limit=100, score_threshold=0.0, offset=0, with_payload=True, mode="hybrid", timeout=None):
+    # timeout (whole seconds) is enforced by the Qdrant server, so an abandoned query stops there too
+    results = qdrant_client.query_points(
+        collection_name=collection_name,
+        **search_arguments(mode, dense_vector, sparse_vector, score_threshold, limit, offset),
+        query_filter=query_filter,
+        limit=limit,
+        offset=offset,
+        with_payload=with_payload,
+        timeout=timeout,
+        # score_threshold=score_threshold,  # Optional: filter out low-score results
+    )
+    return to_records(results.points)
+
+
+def hybrid_query_request(dense_vector, sparse_vector, query_filter, limit=100, score_threshold=0.0, offset=0, with_payload=True, mode="hybrid"):
+    # Same search as query_events_hybrid, as a request for query_batch_points
+    return qmodels.QueryRequest(
+        **search_arguments(mode, dense_vector, sparse_vector, score_threshold, limit, offset),
+        filter=query_filter,
+        limit=limit,
+        offset=offset,
+        with_payload=with_payload,
+    )
+
+
+def query_events_hybrid_batch(collection_name, requests):
+    responses = qdrant_client.query_batch_points(collection_name=collection_name, requests=requests)
+    return [to_records(response.points) for response in responses]
+
+
+def merge_page(results, limit, offset=0):
+    # Merge per-collection result lists by fused score and cut the requested page
+    merged = [record for records in results for record in records]
+    merged.sort(key=lambda record: record["score"], reverse=True)
+    return merged[offset:offset + limit]
+
+
+async def query_events_hybrid_collections(collection_names, dense_vector, sparse_vector, query_filter, limit=100, score_threshold=0.0, offset=0, with_payload=True, mode="hybrid", timeout=None):
+    # Fan out the same hybrid query to every collection concurrently and merge by fused score.
+    # With several collections each one returns its first offset + limit hits and the page is cut after merging.
+    if len(collection_names) == 1:
+        return await resilience.call(
+            "qdrant",
+            query_events_hybrid,
+            dense_vector,
+            sparse_vector,
+            query_filter,
+            collection_name=collection_names[0],
+            limit=limit,
+            score_threshold=score_threshold,
+            offset=offset,
+            with_payload=with_payload,
+            mode=mode,
+            timeout=timeout,
+        )
+    results = await asyncio.gather(*(
+        resilience.call(
+            "qdrant",
+            query_events_hybrid,
+            dense_vector,
+            sparse_vector,
+            query_filter,
+            collection_name=collection_name,
+            limit=offset + limit,
+            score_threshold=score_threshold,
+            with_payload=with_payload,
+            mode=mode,
+            timeout=timeout,
+        )
+        for collection_name in collection_names
+    ))
+    return merge_page(results, limit, offset)
+
+
+async def query_batch_collections(searches):
+    # searches: list of (collection_names, QueryRequest). Requests are grouped into one
+    # query_batch_points call per collection, run concurrently, then merged back per search by
+    # fused score. Each result is a list of records, or the exception of a failed collection.
+    by_collection = {}
+    for index, (collection_names, request) in enumerate(searches):
+        if len(collection_names) > 1 and request.offset:
+            # Paging across collections: fetch from the top and cut the page after merging
+            request = request.model_copy(update={"limit": request.offset + request.limit, "offset": 0})
+        for collection_name in collection_names:
+            by_collection.setdefault(collection_name, []).append((index, request))
+
+    collection_names = list(by_collection)
+    responses = await asyncio.gather(
+        *(
+            resilience.call("qdrant", query_events_hybrid_batch, name, [request for _, request in by_collection[name]])
+            for name in collection_names
+        ),
+        return_exceptions=True,
+    )
+
+    results = [[] for _ in searches]
+    for name, response in zip(collection_names, responses):
+        for position, (index, _) in enumerate(by_collection[name]):
+            if isinstance(response, Exception):
+                results[index] = response
+            elif not isinstance(results[index], Exception):
+                results[index].append(response[position])
+
+    for index, (collection_names, request) in enumerate(searches):
+        if not isinstance(results[index], Exception):
+            offset = (request.offset or 0) if len(collection_names) > 1 else 0
+            results[index] = merge_page(results[index], request.limit, offset)
+    return results
+
+
+def get_event(event_id: str, collection_names, with_payload=True):
+    # Look an event up by its payload id across the given collections
+    id_filter = qmodels.Filter(
+        must=[qmodels.FieldCondition(key="id", match=qmodels.MatchValue(value=event_id))]
+    )
+    for collection_name in collection_names:
+        points, _ = qdrant_client.scroll(
+            collection_name=collection_name,
+            scroll_filter=id_filter,
+            limit=1,
+            with_payload=with_payload,
+        )
+        if points:
+            return points[0].payload
+    return None
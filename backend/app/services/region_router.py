@@ -0,0 +1,51 @@
+from typing import List
+
+from shapely.geometry import box, Point
+from shapely.ops import unary_union
+from app.core.config import REGIONS, DEFAULT_REGION
+from app.services.collection_registry import physical_name, exists
+
+
+# Region geometries are built once from the configured bounding boxes
+REGION_SHAPES = {name: box(*region["bbox"]) for name, region in REGIONS.items()}
+# Events outside every region are stored in DEFAULT_REGION's collection, so any geometry reaching
+# outside this area also searches that collection
+COVERED_AREA = unary_union(list(REGION_SHAPES.values()))
+
+# Every function below returns the physical collection currently serving the region (see
+# collection_registry), which is what reads and writes must target. Reads skip the regions whose
+# collection has not been created yet (nothing was ingested there): they have no events to return.
+
+
+def all_collections() -> List[str]:
+    return [name for name in (physical_name(region["collection"]) for region in REGIONS.values()) if exists(name)]
+
+
+def region_for_event(event: dict) -> str:
+    # Explicit "region" field wins (unless the event is located outside it), then the region
+    # containing the event location, then the default
+    explicit = str(event.get("region", "")).strip().lower()
+    loc = event.get("location", {}) or {}
+    lat = loc.get("latitude", loc.get("lat"))
+    lon = loc.get("longitude", loc.get("lon"))
+    point = Point(lon, lat) if lat is not None and lon is not None else None
+    if explicit in REGIONS and (point is None or REGION_SHAPES[explicit].covers(point)):
+        return explicit
+    if point is not None:
+        for name, shape in REGION_SHAPES.items():
+            if shape.covers(point):
+                return name
+    return DEFAULT_REGION
+
+
+def collection_for_event(event: dict) -> str:
+    return physical_name(REGIONS[region_for_event(event)]["collection"])
+
+
+def collections_for_geometry(geometry) -> List[str]:
+    # Collections of every region the geometry (lon/lat) intersects, plus the default region's
+    # collection when the geometry reaches outside every region (where out-of-region events live)
+    names = [name for name, shape in REGION_SHAPES.items() if shape.intersects(geometry)]
+    if DEFAULT_REGION not in names and not COVERED_AREA.covers(geometry):
+        names.append(DEFAULT_REGION)
+    return [collection for collection in (physical_name(REGIONS[name]["collection"]) for name in names) if exists(collection)]
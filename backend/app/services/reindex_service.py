@@ -0,0 +1,235 @@
+import re
+import time
+import random
+import logging
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+from qdrant_client import models
+from app.core.config import DENSE_MODEL_NAME, SPARSE_MODEL_NAME
+from app.services import embedding_service, cache_service, change_log, collection_registry, qdrant_client as search
+from app.services.ingest_service import client, ensure_collection_exists, DENSE_VECTOR_NAME, SPARSE_VECTOR_NAME, ARCHIVE_SUFFIX
+
+
+logger = logging.getLogger(__name__)
+
+# Zero-downtime reindexing: a new physical collection <name>_vN is built next to the serving one
+# with the new models, caught up with writes that landed meanwhile (via the change log),
+# benchmarked against the serving collection, and then activated. Activation swaps the Qdrant
+# alias <name> in one update_collection_aliases call; workers pick up the new collection and its
+# models (from its metadata) together, so no query mixes the two (see collection_registry).
+
+
+def _next_physical_name(collection_name: str) -> str:
+    pattern = re.compile(rf"^{re.escape(collection_name)}_v(\d+)$")
+    existing = [c.name for c in client.get_collections().collections]
+    versions = [int(m.group(1)) for m in map(pattern.match, existing) if m]
+    return f"{collection_name}_v{max(versions, default=0) + 1}"
+
+
+def _copy_points(points, target: str, dense_model: str, sparse_model: str) -> int:
+    # Re-embed the stored event text with the target's models; point ids and payloads are kept as they are
+    if not points:
+        return 0
+    texts = [p.payload.get("description", "") for p in points]
+    dense = embedding_service.embed_dense(texts, dense_model)
+    sparse = embedding_service.embed_sparse(texts, sparse_model)
+    client.upsert(
+        collection_name=target,
+        points=[
+            models.PointStruct(
+                id=p.id,
+                vector={DENSE_VECTOR_NAME: dense[i], SPARSE_VECTOR_NAME: sparse[i]},
+                payload=p.payload,
+            )
+            for i, p in enumerate(points)
+        ],
+        wait=True,
+    )
+    return len(points)
+
+
+def _copy_all(source: str, target: str, dense_model: str, sparse_model: str, batch_size: int) -> int:
+    copied = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=source, limit=batch_size, offset=offset, with_payload=True, with_vectors=False
+        )
+        copied += _copy_points(points, target, dense_model, sparse_model)
+        logger.info(f"Reindexed {copied} points from {source} into {target}")
+        if offset is None:
+            return copied
+
+
+def _catch_up(source: str, target: str, since: int, dense_model: str, sparse_model: str, batch_size: int) -> int:
+    # Replay changes recorded for the source collection after `since` onto the target; returns the new position
+    while True:
+        page = change_log.read_changes(since, limit=10000)
+        latest = {}
+        for change in page["changes"]:
+            if change["collection"] == source:
+                latest[change["id"]] = change["op"]
+        deleted = [event_id for event_id, op in latest.items() if op == "delete"]
+        changed = [event_id for event_id, op in latest.items() if op != "delete"]
+        if latest:
+            # An updated event may have a new point id, so its old copy is removed like a deleted one
+            client.delete(
+                collection_name=target,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(must=[models.FieldCondition(key="id", match=models.MatchAny(any=list(latest)))])
+                ),
+                wait=True,
+            )
+        for start in range(0, len(changed), batch_size):
+            chunk = changed[start : start + batch_size]
+            points, _ = client.scroll(
+                collection_name=source,
+                scroll_filter=models.Filter(must=[models.FieldCondition(key="id", match=models.MatchAny(any=chunk))]),
+                limit=len(chunk) * 2,
+                with_payload=True,
+                with_vectors=False,
+            )
+            _copy_points(points, target, dense_model, sparse_model)
+        if latest:
+            logger.info(f"Caught up {len(changed)} changed and {len(deleted)} deleted events from {source}")
+        if page["next_since"] == since:
+            return since
+        since = page["next_since"]
+
+
+def _sample_queries(collection_name: str, size: int) -> List[Dict[str, Any]]:
+    # Known-item queries: the start of an event's own description should find that event
+    points, _ = client.scroll(collection_name=collection_name, limit=max(size * 5, 100), with_payload=["id", "description"])
+    points = [p for p in points if p.payload.get("description")]
+    random.Random(0).shuffle(points)
+    return [
+        {"text": " ".join(p.payload["description"].split()[:12]), "id": p.payload.get("id")}
+        for p in points[:size]
+    ]
+
+
+def _run_queries(collection_name: str, queries: List[Dict[str, Any]], limit: int):
+    dense_model, sparse_model = collection_registry.models_for(collection_name)
+    latencies, hits = [], []
+    for query in queries:
+        started = time.perf_counter()
+        dense = embedding_service.embed_dense([query["text"]], dense_model)[0]
+        sparse = embedding_service.embed_sparse([query["text"]], sparse_model)[0]
+        records = search.query_events_hybrid(
+            dense, sparse, None, collection_name=collection_name, limit=limit, with_payload=["id"]
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits.append([record.get("id") for record in records])
+    return latencies, hits
+
+
+def benchmark(current: str, candidate: str, queries: Optional[List[str]] = None, sample_size: int = 50, limit: int = 10) -> Dict[str, Any]:
+    # Latency (query embedding + search) and recall@limit of both collections on the same queries.
+    # Known-item recall is measured on sampled events; overlap@limit compares the two result lists.
+    sampled = _sample_queries(current, sample_size)
+    query_set = [{"text": text, "id": None} for text in queries or []] + sampled
+    if not query_set:
+        raise ValueError(f"No benchmark queries: pass some or ingest events with a description into {current}")
+
+    report = {"queries": len(query_set), "limit": limit}
+    results = {}
+    for name in (current, candidate):
+        latencies, hits = _run_queries(name, query_set, limit)
+        known = [query["id"] in found for query, found in zip(query_set, hits) if query["id"] is not None]
+        results[name] = hits
+        report[name] = {
+            "models": collection_registry.models_for(name),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 2),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+            "known_item_recall": round(sum(known) / len(known), 3) if known else None,
+        }
+    overlaps = [
+        len(set(old) & set(new)) / len(old)
+        for old, new in zip(results[current], results[candidate])
+        if old
+    ]
+    report["overlap_at_limit"] = round(sum(overlaps) / len(overlaps), 3) if overlaps else None
+    return report
+
+
+def activate(collection_name: str, physical: str) -> Dict[str, Any]:
+    # Make `physical` serve `collection_name` (also used to roll back to a previous version)
+    if not client.collection_exists(physical):
+        raise ValueError(f"Collection {physical} does not exist")
+    previous = collection_registry.activate(collection_name, physical)
+    cache_service.bump_collection_versions({previous, physical})
+    return {"collection": collection_name, "active": physical, "previous": previous}
+
+
+def reindex(
+    collection_name: str,
+    dense_model: Optional[str] = None,
+    sparse_model: Optional[str] = None,
+    queries: Optional[List[str]] = None,
+    max_recall_drop: float = 0.05,
+    swap: bool = True,
+    force: bool = False,
+    batch_size: int = 128,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    dense_model = dense_model or DENSE_MODEL_NAME
+    sparse_model = sparse_model or SPARSE_MODEL_NAME
+    current = collection_registry.physical_name(collection_name)
+    if not client.collection_exists(current):
+        raise ValueError(f"{collection_name} has no collection to reindex ({current} does not exist)")
+    target = _next_physical_name(collection_name)
+
+    logger.info(f"Reindexing {current} into {target} with {dense_model}/{sparse_model}")
+    # Position in the change log before copying: everything after it is replayed on the target
+    since = change_log.record_changes([])
+    ensure_collection_exists(target, dense_model=dense_model, sparse_model=sparse_model)
+    copied = _copy_all(current, target, dense_model, sparse_model, batch_size)
+    since = _catch_up(current, target, since, dense_model, sparse_model, batch_size)
+
+    report = {
+        "collection": collection_name,
+        "current": current,
+        "candidate": target,
+        "copied": copied,
+        "benchmark": benchmark(current, target, queries),
+    }
+    current_recall = report["benchmark"][current]["known_item_recall"]
+    candidate_recall = report["benchmark"][target]["known_item_recall"]
+    report["passed"] = current_recall is None or (
+        candidate_recall is not None and candidate_recall >= current_recall - max_recall_drop
+    )
+
+    if swap and (report["passed"] or force):
+        report["activation"] = activate(collection_name, target)
+        # Writes logged on the old collection since the first catch-up. An ingest still writing to
+        # it re-resolves its collections when it finishes and replays its events on the new one.
+        _catch_up(current, target, since, dense_model, sparse_model, batch_size)
+        logger.info(f"{target} is live; {current} is kept for rollback (python -m app.cli activate {collection_name} {current})")
+    elif swap:
+        logger.warning(f"Not activating {target}: known-item recall {candidate_recall} vs {current_recall}")
+
+    report["duration_seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def drop_collection(collection_name: str, physical: str) -> Dict[str, Any]:
+    # Delete a retired physical collection; never the one currently serving
+    collection_registry.refresh()
+    if collection_registry.physical_name(collection_name) == physical:
+        raise ValueError(f"{physical} is serving {collection_name}; activate another collection first")
+    if physical.endswith(ARCHIVE_SUFFIX):
+        raise ValueError("Archive collections are not dropped here")
+    if physical != collection_name:
+        client.delete_collection(physical)
+        collection_registry.remember(physical, None)
+        return {"dropped": physical}
+
+    # Dropping a pre-alias collection frees the name for the alias: resolve and check the collection
+    # to point it at before deleting anything, then create the alias right after the delete
+    serving = collection_registry.metadata(collection_name).get("served_by")
+    if not serving or serving == collection_name or not client.collection_exists(serving):
+        raise ValueError(f"{collection_name} is not served by another existing collection; activate one first")
+    client.delete_collection(physical)
+    collection_registry.remember(physical, None)
+    return {"dropped": physical, "activation": activate(collection_name, serving)}
@@ -0,0 +1,203 @@
+import time
+import asyncio
+import logging
+import contextvars
+from typing import Optional, Dict, Any, Callable, Tuple, Type
+
+from app.core.config import (
+    MAX_IN_FLIGHT_REQUESTS,
+    OVERLOAD_RETRY_AFTER,
+    ORS_TIMEOUT,
+    ORS_MAX_CONCURRENCY,
+    QDRANT_TIMEOUT,
+    QDRANT_MAX_CONCURRENCY,
+    LLM_TIMEOUT,
+    LLM_MAX_CONCURRENCY,
+    EMBEDDING_SERVICE_TIMEOUT,
+    EMBEDDING_MAX_CONCURRENCY,
+    DEPENDENCY_QUEUE_TIMEOUT,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Admission control and guarded calls to external dependencies (ORS, Qdrant, the LLM endpoint, the
+# embedding sidecar or local inference).
+# Every call runs in a thread under a per-dependency concurrency limit, a timeout bounded by the
+# request deadline and a circuit breaker, so a slow dependency sheds load instead of queueing it.
+
+
+class ServiceUnavailable(Exception):
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int = OVERLOAD_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(ServiceUnavailable):
+    status_code = 504
+
+
+# Absolute time.monotonic() deadline of the current request (None outside a request, e.g. CLI jobs)
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+def set_deadline(seconds: float) -> contextvars.Token:
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token: contextvars.Token):
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    # Seconds left before the request deadline, None when there is no deadline
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _bounded(timeout: Optional[float]) -> Optional[float]:
+    # The smaller of `timeout` and the time left before the request deadline (None = no limit)
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+
+class CircuitBreaker:
+    # closed -> open after `failure_threshold` consecutive failures; after `reset_seconds` one trial
+    # call is let through (half-open): success closes the breaker, failure opens it again
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half-open" and self.trial_in_flight):
+            retry_after = max(1, int(self.reset_seconds - (time.monotonic() - self.opened_at)))
+            raise ServiceUnavailable(f"{self.name} is unavailable (circuit open)", retry_after=retry_after)
+        if state == "half-open":
+            self.trial_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+
+class Dependency:
+    def __init__(self, name: str, timeout: float, max_concurrency: int):
+        self.name = name
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.breaker = CircuitBreaker(name)
+
+    async def call(self, func: Callable, *args, ignore: Tuple[Type[BaseException], ...] = (ValueError,), **kwargs):
+        # Exceptions in `ignore` are caller errors (e.g. an address that cannot be geocoded) and do not trip the breaker
+        self.breaker.before_call()
+        try:
+            return await self._call(func, args, kwargs, ignore)
+        finally:
+            # Whatever ended the call (including cancellation, e.g. a search that lost a race), it is
+            # no longer the half-open trial; the breaker state was updated only if it really finished
+            self.breaker.trial_in_flight = False
+
+    async def _call(self, func: Callable, args, kwargs, ignore):
+        queue_timeout = _bounded(DEPENDENCY_QUEUE_TIMEOUT or None)
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), queue_timeout)
+        except asyncio.TimeoutError:
+            raise ServiceUnavailable(f"Too many concurrent {self.name} calls")
+        try:
+            timeout = _bounded(self.timeout)
+        except DeadlineExceeded:
+            self.semaphore.release()
+            raise
+
+        # The slot is released when the thread really finishes, not when we stop waiting for it
+        future = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+        future.add_done_callback(lambda _: self.semaphore.release())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if timeout < self.timeout:
+                # Our own deadline ran out: says nothing about the dependency's health
+                raise DeadlineExceeded(f"Request deadline exceeded waiting for {self.name}")
+            self.breaker.record_failure()
+            raise ServiceUnavailable(f"{self.name} did not answer within {self.timeout:g}s")
+        except ignore:
+            self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+
+DEPENDENCIES: Dict[str, Dependency] = {
+    "ors": Dependency("ors", ORS_TIMEOUT, ORS_MAX_CONCURRENCY),
+    "qdrant": Dependency("qdrant", QDRANT_TIMEOUT, QDRANT_MAX_CONCURRENCY),
+    "llm": Dependency("llm", LLM_TIMEOUT, LLM_MAX_CONCURRENCY),
+    "embedding": Dependency("embedding", EMBEDDING_SERVICE_TIMEOUT, EMBEDDING_MAX_CONCURRENCY),
+}
+
+
+async def call(dependency: str, func: Callable, *args, **kwargs):
+    return await DEPENDENCIES[dependency].call(func, *args, **kwargs)
+
+
+# Requests currently being served by this worker (single event loop, so a plain counter is enough)
+_in_flight = 0
+
+
+def try_admit() -> bool:
+    global _in_flight
+    if MAX_IN_FLIGHT_REQUESTS and _in_flight >= MAX_IN_FLIGHT_REQUESTS:
+        return False
+    _in_flight += 1
+    return True
+
+
+def release():
+    global _in_flight
+    _in_flight -= 1
+
+
+def status() -> Dict[str, Any]:
+    return {
+        "in_flight": _in_flight,
+        "max_in_flight": MAX_IN_FLIGHT_REQUESTS,
+        "dependencies": {
+            name: {"circuit": dep.breaker.state, "consecutive_failures": dep.breaker.failures}
+            for name, dep in DEPENDENCIES.items()
+        },
+    }
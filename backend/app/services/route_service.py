@@ -0,0 +1,526 @@
+import time
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import LineString, Point
+from qdrant_client.http import models as qmodels
+from app.core.config import (
+    TEMPORAL_PREFILTER,
+    TEMPORAL_PREFILTER_MAX_WEEKS,
+    GEO_PREFILTER,
+    GEO_PREFILTER_MAX_CELLS,
+    TIME_AWARE_SLICE_MINUTES,
+    TIME_AWARE_MAX_SLICES,
+    SEARCH_BUDGET_QUERY_TIMEOUT,
+)
+from app.services import openrouteservice_client, qdrant_client, embedding_service, region_router, route_table, collection_registry, search_strategy, resilience
+from app.services.temporal_buckets import week_buckets_between
+from app.services.geo_cells import choose_covering
+from app.services.route_timing import coordinate_times, time_slices, slice_window
+from app.services.geometry_encoding import encode_geometry
+
+
+def buffer_lines(lines_coords, buffer_distance: float):
+    # Buffer lon/lat lines by buffer_distance km (computed in Web Mercator) in one projection pass,
+    # returns [(line, polygon), ...]
+    lines = [LineString(c if len(c) > 1 else [c[0], c[0]]) for c in lines_coords]
+    route_gdf = gpd.GeoDataFrame({'geometry': lines}, crs='EPSG:4326')
+    route_gdf_3857 = route_gdf.to_crs(epsg=3857)
+    polygons = route_gdf_3857.buffer(buffer_distance * 1000).to_crs(epsg=4326)
+    return list(zip(lines, polygons))
+
+
+def buffer_route(route_coords, buffer_distance: float):
+    return buffer_lines([route_coords], buffer_distance)[0]
+
+
+def polygon_coordinates(polygon) -> List[List[float]]:
+    return np.array(polygon.exterior.coords).tolist()
+
+
+def build_geo_conditions(buffer_polygon, covering=None) -> List[qmodels.FieldCondition]:
+    # covering: precomputed (field, cells) for this polygon, [] for none, None to compute it here
+    polygon_coords_qdrant = [{"lon": lon, "lat": lat} for lon, lat in polygon_coordinates(buffer_polygon)]
+
+    geo_conditions = []
+    if GEO_PREFILTER:
+        # Coarse geohash cell match first so filter cost tracks the corridor size
+        if covering is None:
+            covering = choose_covering(buffer_polygon, GEO_PREFILTER_MAX_CELLS)
+        if covering:
+            cell_field, cells = covering
+            geo_conditions.append(qmodels.FieldCondition(key=cell_field, match=qmodels.MatchAny(any=cells)))
+
+    geo_conditions.append(
+        qmodels.FieldCondition(
+            key="location",
+            geo_polygon=qmodels.GeoPolygon(
+                exterior=qmodels.GeoLineString(points=polygon_coords_qdrant)
+            )
+        )
+    )
+    return geo_conditions
+
+
+def build_date_conditions(startinputdate: datetime, endinputdate: datetime) -> List[qmodels.FieldCondition]:
+    date_conditions = []
+    if TEMPORAL_PREFILTER:
+        # Coarse week-bucket match first, skipped for very long windows where it would not be selective
+        request_weeks = week_buckets_between(startinputdate, endinputdate, max_buckets=TEMPORAL_PREFILTER_MAX_WEEKS)
+        if request_weeks:
+            date_conditions.append(
+                qmodels.FieldCondition(key="week_buckets", match=qmodels.MatchAny(any=request_weeks))
+            )
+
+    date_conditions += [
+        qmodels.FieldCondition(
+            key="start_date",
+            range=qmodels.DatetimeRange(lte=endinputdate)
+        ),
+        qmodels.FieldCondition(
+            key="end_date",
+            range=qmodels.DatetimeRange(gte=startinputdate)
+        )
+    ]
+    return date_conditions
+
+
+def build_event_filter(buffer_polygon, startinputdate: datetime, endinputdate: datetime, covering=None) -> qmodels.Filter:
+    return qmodels.Filter(
+        must=build_geo_conditions(buffer_polygon, covering) + build_date_conditions(startinputdate, endinputdate)
+    )
+
+
+def corridor_filter(corridor) -> qmodels.Filter:
+    # Time-aware corridors match any slice whose own buffer and date window both fit
+    if corridor.get("slices"):
+        return qmodels.Filter(
+            should=[
+                qmodels.Filter(
+                    must=build_geo_conditions(piece["polygon"])
+                    + build_date_conditions(piece["startinputdate"], piece["endinputdate"])
+                )
+                for piece in corridor["slices"]
+            ]
+        )
+    return build_event_filter(
+        corridor["polygon"], corridor["startinputdate"], corridor["endinputdate"], corridor.get("covering")
+    )
+
+
+def score_threshold_for(query_text: str) -> float:
+    if query_text.strip() == "":
+        return 0.0  # No text query, so no score threshold
+    return 0.34  # Adjust based on desired relevance I found 0.34 to be a good balance
+
+
+def split_legs(route_feature, route_coords) -> List[Tuple[int, int, float, float]]:
+    # (first coord index, last coord index, distance m, duration s) for each leg between consecutive waypoints
+    properties = route_feature.get('properties', {})
+    way_points = properties.get('way_points') or [0, len(route_coords) - 1]
+    segments = properties.get('segments') or []
+    legs = []
+    for i in range(len(way_points) - 1):
+        segment = segments[i] if i < len(segments) else {}
+        legs.append((way_points[i], way_points[i + 1], segment.get('distance', 0.0), segment.get('duration', 0.0)))
+    return legs
+
+
+def leg_time_windows(startinputdate: datetime, endinputdate: datetime, durations: List[float]):
+    # Split the travel window across legs proportionally to their driving duration
+    total = sum(durations)
+    span = endinputdate - startinputdate
+    windows = []
+    elapsed = 0.0
+    for duration in durations:
+        if total > 0:
+            leg_start = startinputdate + span * (elapsed / total)
+            leg_end = startinputdate + span * ((elapsed + duration) / total)
+        else:
+            leg_start, leg_end = startinputdate, endinputdate
+        windows.append((leg_start, leg_end))
+        elapsed += duration
+    return windows
+
+
+def payload_selector(fields):
+    # Payload projection for Qdrant; id and location are always kept for ordering and detail lookups
+    if not fields:
+        return True
+    return sorted(set(fields) | {"id", "location"})
+
+
+def group_by_models(collection_names) -> dict:
+    # {(dense model, sparse model): [collections built with them]}; one group unless a reindex is half rolled out
+    groups = {}
+    for collection_name in collection_names:
+        groups.setdefault(collection_registry.models_for(collection_name), []).append(collection_name)
+    return groups
+
+
+async def embed_texts(kind: str, texts: List[str], model_name: Optional[str]):
+    # Embedding is a blocking sidecar request or local inference: run it off the event loop, under
+    # the request deadline and the embedding concurrency limit
+    embed = embedding_service.embed_dense if kind == "dense" else embedding_service.embed_sparse
+    return await resilience.call("embedding", embed, texts, model_name)
+
+
+async def embed_query(query_text: str, model_pairs, mode: str = "hybrid") -> dict:
+    # {(dense model, sparse model): (dense vector, sparse vector)} of the query text; a vector the
+    # search mode does not use is not computed (None)
+    need_dense, need_sparse = search_strategy.vectors_needed(mode)
+
+    async def embed(kind, needed, model_name):
+        return (await embed_texts(kind, [query_text], model_name))[0] if needed else None
+
+    model_pairs = list(model_pairs)
+    vectors = await asyncio.gather(*(
+        asyncio.gather(embed("dense", need_dense, dense_model), embed("sparse", need_sparse, sparse_model))
+        for dense_model, sparse_model in model_pairs
+    ))
+    return {model_pair: tuple(pair) for model_pair, pair in zip(model_pairs, vectors)}
+
+
+async def query_corridor(corridor, query_vectors, request, score_threshold, mode: str = "hybrid", timeout: Optional[int] = None):
+    # Only query the regions the buffer actually crosses, each with the query embedded by its own models
+    groups = group_by_models(region_router.collections_for_geometry(corridor["polygon"]))
+    multiple = len(groups) > 1
+    results = await asyncio.gather(*(
+        qdrant_client.query_events_hybrid_collections(
+            collection_names,
+            dense_vector=query_vectors[model_pair][0],
+            sparse_vector=query_vectors[model_pair][1],
+            query_filter=corridor_filter(corridor),
+            # Groups are merged by fused score, so each one returns its first offset + limit hits
+            limit=request.offset + request.numevents if multiple else request.numevents,
+            score_threshold=score_threshold,  # Optional: filter out low-score results
+            offset=0 if multiple else request.offset,
+            with_payload=payload_selector(request.fields),
+            mode=mode,
+            timeout=timeout,
+        )
+        for model_pair, collection_names in groups.items()
+    ))
+    if not multiple:
+        return results[0] if results else []
+    return qdrant_client.merge_page(results, request.numevents, request.offset)
+
+
+def flatten_location(event):
+    loc = event.get('location', {})
+    event['address'] = loc.get('address')
+    event['lat'] = loc.get('lat')
+    event['lon'] = loc.get('lon')
+    return event
+
+
+def trip_addresses(request) -> List[str]:
+    return [request.origin_address, *request.waypoints, request.destination_address]
+
+
+def plan_trip(request, points, routes) -> dict:
+    # Route geometry, buffer and the corridors (whole route, or one per leg) to search for events
+    route_feature = routes['features'][0]
+    route_coords = route_feature['geometry']['coordinates']
+    if len(route_coords) < 2:
+        raise ValueError("Route must contain two different address for buffering.")
+
+    route_line, buffer_polygon = buffer_route(route_coords, request.buffer_distance)
+    plan = {
+        "addresses": trip_addresses(request),
+        "points": points,
+        "route_coords": route_coords,
+        "buffer_polygon": buffer_polygon,
+    }
+
+    if not request.waypoints:
+        plan["corridors"] = [{
+            "line": route_line,
+            "polygon": buffer_polygon,
+            "first": 0,
+            "last": len(route_coords) - 1,
+            "startinputdate": request.startinputdate,
+            "endinputdate": request.endinputdate,
+        }]
+    else:
+        # Multi-stop trip: one buffer and time window per leg
+        legs = split_legs(route_feature, route_coords)
+        windows = leg_time_windows(request.startinputdate, request.endinputdate, [leg[3] for leg in legs])
+        leg_buffers = buffer_lines([route_coords[first:last + 1] for first, last, _, _ in legs], request.buffer_distance)
+        plan["corridors"] = []
+        for (first, last, distance, duration), (leg_start, leg_end), (leg_line, leg_polygon) in zip(legs, windows, leg_buffers):
+            plan["corridors"].append({
+                "line": leg_line,
+                "polygon": leg_polygon,
+                "first": first,
+                "last": last,
+                "startinputdate": leg_start,
+                "endinputdate": leg_end,
+                "distance": distance,
+                "duration": duration,
+            })
+
+    if request.time_aware:
+        add_time_slices(request, plan, route_feature)
+    return plan
+
+
+def add_time_slices(request, plan, route_feature):
+    # Cut each corridor into slices of ~TIME_AWARE_SLICE_MINUTES travel, each with its own buffer and the
+    # window in which the traveller can be there (leaving at startinputdate, arriving by endinputdate)
+    route_coords = plan["route_coords"]
+    times = coordinate_times(route_feature, route_coords)
+    total = times[-1]
+    for corridor in plan["corridors"]:
+        ranges = time_slices(times, corridor["first"], corridor["last"], TIME_AWARE_SLICE_MINUTES * 60, TIME_AWARE_MAX_SLICES)
+        buffers = buffer_lines([route_coords[first:last + 1] for first, last in ranges], request.buffer_distance)
+        corridor["slices"] = []
+        for (first, last), (_, polygon) in zip(ranges, buffers):
+            slice_start, slice_end = slice_window(
+                request.startinputdate, request.endinputdate, total, times[first], times[last], request.dwell_minutes
+            )
+            corridor["slices"].append({"polygon": polygon, "startinputdate": slice_start, "endinputdate": slice_end})
+        corridor["startinputdate"] = min(piece["startinputdate"] for piece in corridor["slices"])
+        corridor["endinputdate"] = max(piece["endinputdate"] for piece in corridor["slices"])
+
+
+def assemble_response(request, plan, corridor_results) -> dict:
+    # corridor_results holds the Qdrant records of each corridor of the plan, in order
+    addresses, points = plan["addresses"], plan["points"]
+    seen_ids = set()
+    response_legs = []
+    all_events = []
+    # Another page exists while any corridor still fills a whole page of fused results
+    has_more = any(len(payloads) >= request.numevents for payloads in corridor_results)
+    for i, (corridor, payloads) in enumerate(zip(plan["corridors"], corridor_results)):
+        line = corridor["line"]
+        corridor_events = []
+        # Buffers overlap around waypoints: an event belongs to the first leg that finds it
+        for event in sorted(payloads, key=lambda e: line.project(Point(e['location']['lon'], e['location']['lat']))):
+            if event.get('id') in seen_ids:
+                continue
+            seen_ids.add(event.get('id'))
+            if request.waypoints:
+                event['leg'] = i
+            corridor_events.append(flatten_location(event))
+        response_legs.append({
+            "leg": i,
+            "from": addresses[i],
+            "to": addresses[i + 1],
+            "distance": corridor.get("distance"),
+            "duration": corridor.get("duration"),
+            "startinputdate": corridor["startinputdate"].isoformat(),
+            "endinputdate": corridor["endinputdate"].isoformat(),
+            "events": corridor_events,
+        })
+        all_events.extend(corridor_events)
+
+    if not all_events:
+        return {"message": "No events found in Qdrant for this route/buffer and date range."}
+
+    response = {
+        "route_coords": plan["route_coords"],
+        "buffer_polygon": polygon_coordinates(plan["buffer_polygon"]),
+        "origin": {"lat": points[0][1], "lon": points[0][0], "address": request.origin_address},
+        "destination": {"lat": points[-1][1], "lon": points[-1][0], "address": request.destination_address},
+        "events": all_events,  # legs in order, each sorted along its own geometry
+        "offset": request.offset,
+        "next_offset": request.offset + request.numevents if has_more else None,
+    }
+    if request.waypoints:
+        response["waypoints"] = [
+            {"lat": point[1], "lon": point[0], "address": address}
+            for point, address in zip(points[1:-1], addresses[1:-1])
+        ]
+        response["legs"] = response_legs
+    return encode_geometry(response, request.geometry_format, request.coordinate_precision, request.simplify_zoom)
+
+
+async def create_event_map(request, touched_collections: Optional[set] = None) -> dict:
+    # touched_collections, if given, receives every collection the searches read (for cache invalidation)
+    await collection_registry.ensure_loaded()
+    entry = route_table.lookup(request)
+    if entry is not None:
+        # Frequent trip: geocodes, route, buffer and geohash covering were precomputed
+        plan = route_table.plan_from_entry(request, entry)
+    else:
+        points = list(await asyncio.gather(*(openrouteservice_client.geocode(address) for address in trip_addresses(request))))
+        routes = await openrouteservice_client.route(points, profile=request.profile_choice)
+        plan = plan_trip(request, points, routes)
+    collection_names = {
+        collection_name
+        for corridor in plan["corridors"]
+        for collection_name in region_router.collections_for_geometry(corridor["polygon"])
+    }
+    if touched_collections is not None:
+        touched_collections.update(collection_names)
+
+    score_threshold = score_threshold_for(request.query_text)
+    mode = search_strategy.choose_mode(request.query_text, request.search_mode)
+    started = time.perf_counter()
+    # Embedding models are shared per process (or served by the sidecar, see embedding_service)
+    query_vectors = await embed_query(request.query_text, group_by_models(collection_names), mode)
+
+    async def search(search_mode, timeout=None):
+        # Corridors (legs) are queried concurrently
+        return await asyncio.gather(*(
+            query_corridor(corridor, query_vectors, request, score_threshold, search_mode, timeout)
+            for corridor in plan["corridors"]
+        ))
+
+    fell_back = False
+    if mode == "hybrid_budget":
+        # A sparse search answers instead if hybrid misses the latency budget
+        corridor_results, fell_back = await search_strategy.within_budget(
+            lambda: search("hybrid", SEARCH_BUDGET_QUERY_TIMEOUT), lambda: search("sparse", SEARCH_BUDGET_QUERY_TIMEOUT)
+        )
+    else:
+        corridor_results = await search(mode)
+    search_strategy.record(mode, request.search_mode, search_strategy.elapsed_ms(started), fell_back)
+
+    response = assemble_response(request, plan, corridor_results)
+    response["search_mode"] = mode
+    if fell_back:
+        response["search_fallback"] = True
+    return response
+
+
+async def create_event_maps_batch(requests) -> List[dict]:
+    # Many create_map requests at once: geocodes, routes and query embeddings are deduplicated
+    # across the batch and all searches go through query_batch_points. A failing item returns
+    # {"error": ...} without aborting the others.
+    results: List[dict] = [None] * len(requests)
+
+    # Precomputed trips skip geocoding and routing entirely
+    table_entries = {index: route_table.lookup(request) for index, request in enumerate(requests)}
+    addresses = sorted({
+        address
+        for index, request in enumerate(requests) if table_entries[index] is None
+        for address in trip_addresses(request)
+    })
+    geocoded = await asyncio.gather(
+        *(openrouteservice_client.geocode(address) for address in addresses), return_exceptions=True
+    )
+    geocodes = dict(zip(addresses, geocoded))
+
+    # Distinct routes are requested concurrently (bounded by the ORS concurrency limit)
+    trip_points = {}
+    for index, request in enumerate(requests):
+        if table_entries[index] is not None:
+            continue
+        failed = [geocodes[address] for address in trip_addresses(request) if isinstance(geocodes[address], Exception)]
+        if failed:
+            results[index] = {"error": str(failed[0])}
+        else:
+            trip_points[index] = [geocodes[address] for address in trip_addresses(request)]
+    route_keys = sorted({(tuple(points), requests[index].profile_choice) for index, points in trip_points.items()})
+    routed = await asyncio.gather(
+        *(openrouteservice_client.route(list(points), profile=profile) for points, profile in route_keys),
+        return_exceptions=True,
+    )
+    routes_cache = dict(zip(route_keys, routed))
+
+    plans = {}
+    for index, request in enumerate(requests):
+        try:
+            if table_entries[index] is not None:
+                plans[index] = route_table.plan_from_entry(request, table_entries[index])
+            elif index in trip_points:
+                routes = routes_cache[(tuple(trip_points[index]), request.profile_choice)]
+                if isinstance(routes, Exception):
+                    raise routes
+                plans[index] = plan_trip(request, trip_points[index], routes)
+        except Exception as e:
+            results[index] = {"error": str(e)}
+
+    try:
+        await search_plans(requests, plans, results)
+    except resilience.DeadlineExceeded as e:
+        # Routing used up the deadline: the items already answered (errors included) are still returned
+        for index in plans:
+            if results[index] is None:
+                results[index] = {"error": str(e)}
+    return results
+
+
+async def search_plans(requests, plans: dict, results: List[dict]):
+    # Embed and search the planned items of a batch, filling their entries of `results`
+    await collection_registry.ensure_loaded()
+
+    # Every search is grouped by the models of the collections it reads; each query text is embedded
+    # once per model pair, and only with the vectors its search mode uses. The latency budget of
+    # hybrid_budget does not apply to batches (one query_batch_points call): it runs as hybrid.
+    modes = {
+        index: search_strategy.choose_mode(requests[index].query_text, requests[index].search_mode).replace("hybrid_budget", "hybrid")
+        for index in plans
+    }
+    corridor_groups = {
+        index: [group_by_models(region_router.collections_for_geometry(corridor["polygon"])) for corridor in plan["corridors"]]
+        for index, plan in plans.items()
+    }
+    dense_texts, sparse_texts = {}, {}
+    for index, groups_per_corridor in corridor_groups.items():
+        need_dense, need_sparse = search_strategy.vectors_needed(modes[index])
+        for groups in groups_per_corridor:
+            for model_pair in groups:
+                if need_dense:
+                    dense_texts.setdefault(model_pair[0], set()).add(requests[index].query_text)
+                if need_sparse:
+                    sparse_texts.setdefault(model_pair[1], set()).add(requests[index].query_text)
+    dense_vectors, sparse_vectors = {}, {}
+    for dense_model, texts in dense_texts.items():
+        texts = sorted(texts)
+        dense_vectors.update(zip(((text, dense_model) for text in texts), await embed_texts("dense", texts, dense_model)))
+    for sparse_model, texts in sparse_texts.items():
+        texts = sorted(texts)
+        sparse_vectors.update(zip(((text, sparse_model) for text in texts), await embed_texts("sparse", texts, sparse_model)))
+
+    searches = []
+    search_owner = []
+    for index, plan in plans.items():
+        request = requests[index]
+        for position, (corridor, groups) in enumerate(zip(plan["corridors"], corridor_groups[index])):
+            multiple = len(groups) > 1
+            for (dense_model, sparse_model), collection_names in groups.items():
+                query_request = qdrant_client.hybrid_query_request(
+                    dense_vectors.get((request.query_text, dense_model)),
+                    sparse_vectors.get((request.query_text, sparse_model)),
+                    corridor_filter(corridor),
+                    limit=request.offset + request.numevents if multiple else request.numevents,
+                    score_threshold=score_threshold_for(request.query_text),
+                    offset=0 if multiple else request.offset,
+                    with_payload=payload_selector(request.fields),
+                    mode=modes[index],
+                )
+                searches.append((collection_names, query_request))
+                search_owner.append((index, position))
+
+    search_results = await qdrant_client.query_batch_collections(searches)
+
+    # Merge the model groups of each corridor back into one page
+    grouped = {}
+    for owner, records in zip(search_owner, search_results):
+        grouped.setdefault(owner, []).append(records)
+    corridor_results = {index: [] for index in plans}
+    for index, plan in plans.items():
+        request = requests[index]
+        for position in range(len(plan["corridors"])):
+            parts = grouped.get((index, position), [])
+            failed = [records for records in parts if isinstance(records, Exception)]
+            if failed:
+                corridor_results[index].append(failed[0])
+            elif len(parts) == 1:
+                corridor_results[index].append(parts[0])
+            else:
+                corridor_results[index].append(qdrant_client.merge_page(parts, request.numevents, request.offset))
+
+    for index, plan in plans.items():
+        failed = [records for records in corridor_results[index] if isinstance(records, Exception)]
+        if failed:
+            results[index] = {"error": str(failed[0])}
+        else:
+            results[index] = assemble_response(requests[index], plan, corridor_results[index])
+            results[index]["search_mode"] = modes[index]
@@ -0,0 +1,234 @@
+import os
+import json
+import gzip
+import fcntl
+import time
+import logging
+import itertools
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple
+
+from shapely.geometry import LineString, Polygon
+from app.core.config import (
+    ROUTE_TABLE_PATH,
+    ROUTE_REQUEST_COUNTS_PATH,
+    ROUTE_REQUEST_COUNTS_SIZE,
+    ROUTE_TABLE_SIZE,
+    GEO_PREFILTER_MAX_CELLS,
+    PLACES_PATH,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Precomputed trips: (origin, destination, profile, buffer km) -> geocoded points, route line, buffer
+# polygon and geohash covering. create_event_map serves these without ORS calls or projection work.
+# The table is one gzipped JSON file, written by the precompute job and reloaded by every worker
+# when its mtime changes.
+TABLE_VERSION = 1
+COORD_DECIMALS = 6
+
+_table = {"mtime": None, "routes": {}}
+# /create_map trips counted by this worker since its last flush
+_pending = Counter()
+
+
+def normalize_address(address: str) -> str:
+    return " ".join(address.split()).lower()
+
+
+def trip_key(origin: str, destination: str, profile: str, buffer_distance: float) -> str:
+    return json.dumps([normalize_address(origin), normalize_address(destination), profile, float(buffer_distance)])
+
+
+def request_key(request) -> Optional[str]:
+    # Only plain two-point trips are precomputed: waypoints and time-aware slicing depend on the request
+    if request.waypoints or request.time_aware or request.buffer_distance is None:
+        return None
+    return trip_key(request.origin_address, request.destination_address, request.profile_choice, request.buffer_distance)
+
+
+def log_request(request):
+    # Counted in memory (no I/O on the request path); flush_requests merges the counts into the file
+    key = request_key(request)
+    if key is not None and ROUTE_REQUEST_COUNTS_PATH:
+        _pending[key] += 1
+
+
+def flush_requests(path: str = ROUTE_REQUEST_COUNTS_PATH, max_keys: int = ROUTE_REQUEST_COUNTS_SIZE) -> Optional[int]:
+    # Merge this worker's trip counts into the counts file shared by the node's workers, which keeps
+    # only the max_keys most requested trips; returns the number of trips merged (None if none)
+    global _pending
+    if not _pending or not path:
+        return None
+    pending, _pending = _pending, Counter()
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            content = f.read()
+            counts = Counter(json.loads(content) if content.strip() else {})
+            counts.update(pending)
+            f.seek(0)
+            f.truncate()
+            json.dump(dict(counts.most_common(max_keys)), f, separators=(",", ":"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not flush route request counts: {e}")
+        _pending.update(pending)
+        return None
+    return len(pending)
+
+
+def load(path: str = ROUTE_TABLE_PATH) -> int:
+    # (Re)load the table if the file changed since the last load; returns the number of routes
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return len(_table["routes"])
+    if mtime != _table["mtime"]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read route table {path}: {e}")
+            return len(_table["routes"])
+        if data.get("version") != TABLE_VERSION:
+            logger.warning(f"Ignoring route table {path} with version {data.get('version')}")
+            return len(_table["routes"])
+        _table["routes"] = data.get("routes", {})
+        _table["mtime"] = mtime
+        logger.info(f"Loaded {len(_table['routes'])} precomputed routes from {path}")
+    return len(_table["routes"])
+
+
+def lookup(request) -> Optional[Dict[str, Any]]:
+    key = request_key(request)
+    if key is None:
+        return None
+    load()
+    return _table["routes"].get(key)
+
+
+def plan_from_entry(request, entry: Dict[str, Any]) -> dict:
+    # Same shape as route_service.plan_trip, built from stored geometry
+    route_coords = entry["route_coords"]
+    buffer_polygon = Polygon(entry["buffer_polygon"])
+    return {
+        "addresses": [request.origin_address, request.destination_address],
+        "points": [tuple(point) for point in entry["points"]],
+        "route_coords": route_coords,
+        "buffer_polygon": buffer_polygon,
+        "corridors": [{
+            "line": LineString(route_coords),
+            "polygon": buffer_polygon,
+            "first": 0,
+            "last": len(route_coords) - 1,
+            "startinputdate": request.startinputdate,
+            "endinputdate": request.endinputdate,
+            "covering": entry["covering"],
+        }],
+    }
+
+
+def _round(coords) -> List[List[float]]:
+    return [[round(lon, COORD_DECIMALS), round(lat, COORD_DECIMALS)] for lon, lat in coords]
+
+
+def compute_entry(origin: str, destination: str, profile: str, buffer_distance: float) -> Dict[str, Any]:
+    from app.services import openrouteservice_client, route_service
+    from app.services.geo_cells import choose_covering
+
+    points = [openrouteservice_client.geocode_address(origin), openrouteservice_client.geocode_address(destination)]
+    routes = openrouteservice_client.get_route(points, profile=profile)
+    route_feature = routes["features"][0]
+    route_coords = route_feature["geometry"]["coordinates"]
+    if len(route_coords) < 2:
+        raise ValueError("Route must contain two different address for buffering.")
+    _, buffer_polygon = route_service.buffer_route(route_coords, buffer_distance)
+    covering = choose_covering(buffer_polygon, GEO_PREFILTER_MAX_CELLS)
+    summary = route_feature.get("properties", {}).get("summary", {})
+    return {
+        "points": [list(point) for point in points],
+        "route_coords": _round(route_coords),
+        "buffer_polygon": _round(buffer_polygon.exterior.coords),
+        "covering": list(covering) if covering else [],
+        "distance": summary.get("distance"),
+        "duration": summary.get("duration"),
+        "computed_at": time.time(),
+    }
+
+
+def keys_from_log(limit: int, path: str = ROUTE_REQUEST_COUNTS_PATH) -> List[Tuple[str, int]]:
+    # Most requested trips, with their request counts
+    flush_requests(path)
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        content = f.read()
+    return Counter(json.loads(content) if content.strip() else {}).most_common(limit)
+
+
+def keys_from_places(limit: int, profiles: List[str], buffers: List[float], path: str = PLACES_PATH) -> List[Tuple[str, int]]:
+    # Ordered pairs of gazetteer towns, both directions, all pairs among the first k towns before town k+1
+    with open(path, "r", encoding="utf-8") as f:
+        towns = list(json.load(f))
+    pairs = (
+        pair
+        for k in range(1, len(towns))
+        for j in range(k)
+        for pair in ((towns[j], towns[k]), (towns[k], towns[j]))
+    )
+    combos = (
+        (trip_key(origin, destination, profile, buffer_distance), 0)
+        for origin, destination in pairs
+        for profile in profiles
+        for buffer_distance in buffers
+    )
+    return list(itertools.islice(combos, limit))
+
+
+def write_table(routes: Dict[str, Any], path: str = ROUTE_TABLE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({"version": TABLE_VERSION, "created_at": time.time(), "routes": routes}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def precompute_routes(
+    source: str = "log",
+    limit: int = ROUTE_TABLE_SIZE,
+    profiles: Optional[List[str]] = None,
+    buffers: Optional[List[float]] = None,
+    path: str = ROUTE_TABLE_PATH,
+) -> Dict[str, Any]:
+    # Route and buffer the selected trips and replace the table. A trip that fails keeps its previous
+    # entry, so an ORS outage during a refresh never shrinks the table.
+    started = time.perf_counter()
+    if source == "log":
+        selected = keys_from_log(limit)
+    elif source == "places":
+        selected = keys_from_places(limit, profiles or ["driving-car"], buffers or [5.0])
+    else:
+        raise ValueError(f"Unknown route source: {source}")
+
+    load(path)
+    previous = _table["routes"]
+    routes, failed = {}, 0
+    for key, _ in selected:
+        origin, destination, profile, buffer_distance = json.loads(key)
+        try:
+            routes[key] = compute_entry(origin, destination, profile, buffer_distance)
+        except Exception as e:
+            failed += 1
+            logger.warning(f"Could not precompute route {key}: {e}")
+            if key in previous:
+                routes[key] = previous[key]
+    write_table(routes, path)
+    load(path)
+
+    duration = time.perf_counter() - started
+    logger.info(f"Precomputed {len(routes)} routes ({failed} failed) in {duration:.1f}s")
+    return {"routes": len(routes), "failed": failed, "path": path, "duration_seconds": round(duration, 3)}
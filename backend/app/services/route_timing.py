@@ -0,0 +1,62 @@
+import math
+from datetime import timedelta
+from typing import List, Tuple
+
+
+def _haversine(a, b) -> float:
+    # Great-circle distance in metres between two lon/lat points
+    lon1, lat1, lon2, lat2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371008.8 * math.asin(math.sqrt(h))
+
+
+def coordinate_times(route_feature, route_coords) -> List[float]:
+    # Estimated seconds from departure at each route coordinate, from the ORS step durations
+    # (interpolated by distance inside a step), or from the total duration if steps are missing
+    cumulative = [0.0]
+    for a, b in zip(route_coords, route_coords[1:]):
+        cumulative.append(cumulative[-1] + _haversine(a, b))
+
+    properties = route_feature.get('properties', {})
+    segments = properties.get('segments') or []
+    steps = [step for segment in segments for step in segment.get('steps', [])]
+    if steps:
+        times = [0.0] * len(route_coords)
+        elapsed = 0.0
+        for step in steps:
+            first, last = step['way_points']
+            span = cumulative[last] - cumulative[first]
+            for k in range(first + 1, last + 1):
+                fraction = (cumulative[k] - cumulative[first]) / span if span > 0 else 1.0
+                times[k] = elapsed + step.get('duration', 0.0) * fraction
+            elapsed += step.get('duration', 0.0)
+        return times
+
+    total = properties.get('summary', {}).get('duration') or sum(s.get('duration', 0.0) for s in segments)
+    length = cumulative[-1]
+    return [total * (d / length) if length > 0 else 0.0 for d in cumulative]
+
+
+def time_slices(times, first: int, last: int, slice_seconds: float, max_slices: int) -> List[Tuple[int, int]]:
+    # Split coordinates first..last into consecutive index ranges of roughly slice_seconds travel each
+    duration = times[last] - times[first]
+    if duration <= 0 or last - first < 2:
+        return [(first, last)]
+    slice_seconds = max(slice_seconds, duration / max_slices)
+    slices = []
+    start = first
+    for k in range(first + 1, last + 1):
+        if times[k] - times[start] >= slice_seconds or k == last:
+            slices.append((start, k))
+            start = k
+    return slices
+
+
+def slice_window(startinputdate, endinputdate, total_seconds, enter_seconds, exit_seconds, dwell_minutes=0.0):
+    # Earliest: leaving at startinputdate. Latest: still arriving by endinputdate.
+    # If the window is shorter than the trip itself, assume departure at startinputdate.
+    earliest = startinputdate + timedelta(seconds=enter_seconds)
+    latest = endinputdate - timedelta(seconds=total_seconds - exit_seconds)
+    if latest < earliest:
+        latest = startinputdate + timedelta(seconds=exit_seconds)
+    return earliest, latest + timedelta(minutes=dwell_minutes)
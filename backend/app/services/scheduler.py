@@ -0,0 +1,77 @@
+import os
+import fcntl
+import asyncio
+import logging
+from typing import Callable
+
+from app.core.config import (
+    SCHEDULER_LOCK_DIR,
+    EXPIRY_MODE,
+    EXPIRY_INTERVAL_SECONDS,
+    ROUTE_TABLE_REFRESH_SECONDS,
+    ROUTE_REQUEST_FLUSH_SECONDS,
+    COLLECTION_REGISTRY_TTL,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Held for the lifetime of the process: the worker holding a job's lock is the one that runs it
+_leader_locks = {}
+_tasks = []
+
+
+def acquire_job_lock(job_name: str) -> bool:
+    if job_name in _leader_locks:
+        return True
+    os.makedirs(SCHEDULER_LOCK_DIR, exist_ok=True)
+    lock_file = open(os.path.join(SCHEDULER_LOCK_DIR, f"{job_name}.lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+    _leader_locks[job_name] = lock_file
+    return True
+
+
+async def run_periodically(job_name: str, interval_seconds: float, job: Callable, *args):
+    # Runs a blocking job in a thread every interval; failures are logged and retried next round
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await asyncio.to_thread(job, *args)
+            if result is not None:
+                logger.info(f"Scheduled job {job_name} finished: {result}")
+        except Exception as e:
+            logger.error(f"Scheduled job {job_name} failed: {e}")
+
+
+def schedule(job_name: str, interval_seconds: float, job: Callable, *args) -> bool:
+    # Start a periodic job unless it is disabled or another worker on this node already runs it
+    if interval_seconds <= 0 or not acquire_job_lock(job_name):
+        return False
+    logger.info(f"Scheduling {job_name} every {interval_seconds}s")
+    _tasks.append(asyncio.create_task(run_periodically(job_name, interval_seconds, job, *args)))
+    return True
+
+
+def schedule_in_every_worker(job_name: str, interval_seconds: float, job: Callable, *args) -> bool:
+    # Start a periodic job that each worker runs on its own state
+    if interval_seconds <= 0:
+        return False
+    _tasks.append(asyncio.create_task(run_periodically(job_name, interval_seconds, job, *args)))
+    return True
+
+
+def start_background_jobs():
+    from app.services.ingest_service import expire_events
+    from app.services.route_table import precompute_routes, flush_requests
+    from app.services import collection_registry
+    schedule_in_every_worker("flush_route_requests", ROUTE_REQUEST_FLUSH_SECONDS, flush_requests)
+    # Requests read the collection registry snapshot without waiting for Qdrant
+    if schedule_in_every_worker("refresh_collection_registry", COLLECTION_REGISTRY_TTL, collection_registry.refresh):
+        collection_registry.refresh_in_background()
+    schedule("expire_events", EXPIRY_INTERVAL_SECONDS, expire_events, EXPIRY_MODE)
+    # Re-route the most requested trips; other workers pick the new table up by its mtime
+    schedule("precompute_routes", ROUTE_TABLE_REFRESH_SECONDS, precompute_routes)
@@ -0,0 +1,88 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, Tuple
+
+import numpy as np
+from app.core.config import SEARCH_SHORT_QUERY_TOKENS, SEARCH_LATENCY_BUDGET_MS, SEARCH_STATS_WINDOW
+
+
+logger = logging.getLogger(__name__)
+
+# Which search runs for a request: "sparse" (keywords only), "dense" (semantic only), "hybrid"
+# (both fused with RRF), or "hybrid_budget" (hybrid, but the sparse-only result is returned if
+# hybrid misses SEARCH_LATENCY_BUDGET_MS). "auto" picks one from the query text.
+SEARCH_MODES = ("sparse", "dense", "hybrid", "hybrid_budget")
+
+# Per-worker stats over the last SEARCH_STATS_WINDOW searches of each mode
+_stats = {
+    mode: {"count": 0, "auto_selected": 0, "fallbacks": 0, "latencies_ms": deque(maxlen=SEARCH_STATS_WINDOW)}
+    for mode in SEARCH_MODES
+}
+
+
+def choose_mode(query_text: str, requested: str = "auto") -> str:
+    if requested != "auto":
+        return requested
+    tokens = (query_text or "").split()
+    if not tokens:
+        # The sparse vector of an empty query matches nothing
+        return "dense"
+    if len(tokens) <= SEARCH_SHORT_QUERY_TOKENS:
+        # Short keyword queries ("music") are answered as well by BM25 alone, without dense inference
+        return "sparse"
+    return "hybrid"
+
+
+def vectors_needed(mode: str) -> Tuple[bool, bool]:
+    # (dense, sparse) query embeddings the mode uses
+    if mode == "sparse":
+        return False, True
+    if mode == "dense":
+        return True, False
+    return True, True
+
+
+async def within_budget(primary, fallback, budget_ms: float = SEARCH_LATENCY_BUDGET_MS):
+    # primary and fallback are coroutine functions. The primary (hybrid) search answers if it is
+    # ready within the budget; only otherwise is the fallback (sparse) search started, so Qdrant
+    # does not get twice the queries when it is already slow. Both should carry a server-side
+    # timeout: cancelling the task does not stop a query already sent. Returns (result, fell_back).
+    task = asyncio.ensure_future(primary())
+    done, _ = await asyncio.wait({task}, timeout=budget_ms / 1000)
+    if task in done and task.exception() is None:
+        return task.result(), False
+    if task in done:
+        logger.warning(f"Hybrid search failed, using a sparse search: {task.exception()}")
+    else:
+        task.cancel()
+    return await fallback(), True
+
+
+def record(mode: str, requested: str, latency_ms: float, fell_back: bool = False):
+    stats = _stats[mode]
+    stats["count"] += 1
+    if requested == "auto":
+        stats["auto_selected"] += 1
+    if fell_back:
+        stats["fallbacks"] += 1
+    stats["latencies_ms"].append(latency_ms)
+
+
+def get_stats() -> Dict[str, Any]:
+    report = {}
+    for mode, stats in _stats.items():
+        latencies = list(stats["latencies_ms"])
+        report[mode] = {
+            "count": stats["count"],
+            "auto_selected": stats["auto_selected"],
+            "fallbacks": stats["fallbacks"],
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 2) if latencies else None,
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 2) if latencies else None,
+        }
+    return {"modes": report, "window": SEARCH_STATS_WINDOW, "latency_budget_ms": SEARCH_LATENCY_BUDGET_MS}
+
+
+def elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
@@ -0,0 +1,190 @@
+import os
+import re
+import gzip
+import json
+import time
+import base64
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from qdrant_client import models
+from app.core.config import REGIONS
+from app.services import region_router, cache_service, change_log, collection_registry, reindex_service
+from app.services.ingest_service import (
+    client,
+    ensure_collection_exists,
+    DENSE_VECTOR_NAME,
+    SPARSE_VECTOR_NAME,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Export files are gzipped JSON lines: one header line, then one line per point. Vectors are
+# stored as base64 little-endian float32/uint32 arrays, which keeps files compact without
+# adding a columnar-format dependency.
+EXPORT_FORMAT = "remap-collection-export"
+EXPORT_FORMAT_VERSION = 1
+
+
+def _pack(values, dtype) -> str:
+    return base64.b64encode(np.asarray(values, dtype=dtype).tobytes()).decode("ascii")
+
+
+def _unpack(data: str, dtype) -> List:
+    return np.frombuffer(base64.b64decode(data), dtype=dtype).tolist()
+
+
+def _encode_point(point) -> dict:
+    sparse = point.vector[SPARSE_VECTOR_NAME]
+    return {
+        "id": point.id,
+        "dense": _pack(point.vector[DENSE_VECTOR_NAME], "<f4"),
+        "sparse_indices": _pack(sparse.indices, "<u4"),
+        "sparse_values": _pack(sparse.values, "<f4"),
+        "payload": point.payload,
+    }
+
+
+def _decode_point(record: dict) -> models.PointStruct:
+    return models.PointStruct(
+        id=record["id"],
+        vector={
+            DENSE_VECTOR_NAME: _unpack(record["dense"], "<f4"),
+            SPARSE_VECTOR_NAME: models.SparseVector(
+                indices=_unpack(record["sparse_indices"], "<u4"),
+                values=_unpack(record["sparse_values"], "<f4"),
+            ),
+        },
+        payload=record["payload"],
+    )
+
+
+def logical_name(physical: str) -> Optional[str]:
+    # Configured collection name a physical collection serves (or is a version of: <name>_vN)
+    for region in REGIONS.values():
+        name = region["collection"]
+        if physical == name or collection_registry.physical_name(name) == physical:
+            return name
+        if re.fullmatch(rf"{re.escape(name)}_v\d+", physical):
+            return name
+    return None
+
+
+def export_path(output_dir: str, collection_name: str) -> str:
+    return os.path.join(output_dir, f"{collection_name}.jsonl.gz")
+
+
+def export_collection(collection_name: str, path: str, batch_size: int = 512) -> Dict[str, Any]:
+    # Stream every point (vectors + payload) of a collection to a gzipped JSON-lines file
+    started = time.perf_counter()
+    info = client.get_collection(collection_name)
+    dense_dim = info.config.params.vectors[DENSE_VECTOR_NAME].size
+    dense_model, sparse_model = collection_registry.models_for(collection_name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    exported = 0
+    tmp_path = path + ".part"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        header = {
+            "format": EXPORT_FORMAT,
+            "format_version": EXPORT_FORMAT_VERSION,
+            "collection": collection_name,
+            "serves": logical_name(collection_name),
+            "dense_dim": dense_dim,
+            "dense_model": dense_model,
+            "sparse_model": sparse_model,
+        }
+        f.write(json.dumps(header) + "\n")
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            for point in points:
+                f.write(json.dumps(_encode_point(point), ensure_ascii=False) + "\n")
+            exported += len(points)
+            if offset is None:
+                break
+    os.replace(tmp_path, path)  # never leave a truncated export under the final name
+    duration = time.perf_counter() - started
+    logger.info(f"Exported {exported} points from {collection_name} to {path} in {duration:.1f}s")
+    return {"collection": collection_name, "path": path, "points": exported, "duration_seconds": round(duration, 3)}
+
+
+def export_collections(output_dir: str, collection_names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    collection_names = collection_names or region_router.all_collections()
+    return [export_collection(name, export_path(output_dir, name)) for name in collection_names]
+
+
+def read_export_header(path: str) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+    if header.get("format") != EXPORT_FORMAT:
+        raise ValueError(f"{path} is not a collection export")
+    return header
+
+
+def _iter_points(path: str, event_ids: List[Any]) -> Iterator[models.PointStruct]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        f.readline()  # header
+        for line in f:
+            if line.strip():
+                point = _decode_point(json.loads(line))
+                event_ids.append(point.payload.get("id"))
+                yield point
+
+
+def import_collection(
+    path: str,
+    collection_name: Optional[str] = None,
+    batch_size: int = 256,
+    parallel: int = 4,
+    activate: Optional[bool] = None,
+) -> Dict[str, Any]:
+    # Bulk-load an export back into Qdrant with parallel batched uploads (no geocoding or embedding).
+    # Importing a version collection (<name>_vN) points <name> at it when activate is True, or by
+    # default when nothing serves <name> yet (e.g. restoring onto a fresh node).
+    started = time.perf_counter()
+    header = read_export_header(path)
+    collection_name = collection_name or header["collection"]
+    header_models = (header.get("dense_model"), header.get("sparse_model"))
+    # Queries against the imported collection must use the models its vectors were built with
+    if client.collection_exists(collection_name):
+        if "dense_model" in header and tuple(collection_registry.models_for(collection_name)) != header_models:
+            if client.count(collection_name, exact=True).count:
+                raise ValueError(
+                    f"{collection_name} is built with {collection_registry.models_for(collection_name)} but "
+                    f"{path} with {header_models}: import it into an empty or new collection"
+                )
+            collection_registry.register(collection_name, *header_models)
+    else:
+        ensure_collection_exists(collection_name, dense_dim=header["dense_dim"], dense_model=header_models[0], sparse_model=header_models[1])
+
+    event_ids: List[Any] = []
+    client.upload_points(
+        collection_name=collection_name,
+        points=_iter_points(path, event_ids),
+        batch_size=batch_size,
+        parallel=parallel,
+        wait=True,
+    )
+    change_log.record_changes(("insert", collection_name, event_id) for event_id in event_ids)
+    cache_service.bump_collection_versions([collection_name])
+
+    result = {"collection": collection_name, "path": path, "points": len(event_ids)}
+    logical = header.get("serves") or logical_name(collection_name)
+    if logical and logical != collection_name:
+        if activate is None:
+            activate = not client.collection_exists(collection_registry.physical_name(logical))
+        if activate:
+            result["activation"] = reindex_service.activate(logical, collection_name)
+
+    duration = time.perf_counter() - started
+    logger.info(f"Imported {len(event_ids)} points from {path} into {collection_name} in {duration:.1f}s")
+    result["duration_seconds"] = round(duration, 3)
+    return result
@@ -0,0 +1,37 @@
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional, Union
+
+
+# Week buckets are counted from Monday 1970-01-05 so that each bucket is a calendar (ISO) week
+WEEK_EPOCH = datetime(1970, 1, 5, tzinfo=timezone.utc)
+WEEK = timedelta(days=7)
+
+
+def parse_datetime(value: Union[str, datetime, None]) -> Optional[datetime]:
+    # Accepts ISO 8601 strings (with or without trailing Z) and naive/aware datetimes, returns UTC
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def week_bucket(value: datetime) -> int:
+    return (parse_datetime(value) - WEEK_EPOCH) // WEEK
+
+
+def week_buckets_between(start, end, max_buckets: Optional[int] = None) -> Optional[List[int]]:
+    # All week buckets touched by [start, end]; None if dates are missing or the span exceeds max_buckets
+    start_dt = parse_datetime(start)
+    end_dt = parse_datetime(end)
+    if start_dt is None or end_dt is None or end_dt < start_dt:
+        return None
+    first, last = week_bucket(start_dt), week_bucket(end_dt)
+    if max_buckets is not None and last - first + 1 > max_buckets:
+        return None
+    return list(range(first, last + 1))
@@ -0,0 +1,15 @@
+import os
+import tempfile
+
+# Settings are read when app modules are imported (the ORS client is built at import time): give
+# the tests dummy credentials and keep every state file out of /tmp/remap
+os.environ.setdefault("OPENROUTE_API_KEY", "test")
+os.environ.setdefault("QDRANT_SERVER", "http://localhost:6333")
+_state_dir = tempfile.mkdtemp(prefix="remap-tests-")
+for name, filename in [
+    ("CHANGELOG_PATH", "changes.jsonl"),
+    ("COLLECTION_VERSIONS_PATH", "collection_versions.json"),
+    ("ROUTE_TABLE_PATH", "route_table.json.gz"),
+    ("ROUTE_REQUEST_COUNTS_PATH", "route_request_counts.json"),
+]:
+    os.environ.setdefault(name, os.path.join(_state_dir, filename))
@@ -0,0 +1,53 @@
+import pytest
+from app.services import cache_service
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_service, "COLLECTION_VERSIONS_PATH", str(tmp_path / "collection_versions.json"))
+    monkeypatch.setattr(cache_service, "_versions_cache", {"mtime": None, "versions": {}})
+    monkeypatch.setattr(cache_service, "_responses", type(cache_service._responses)())
+    monkeypatch.setattr(cache_service, "_cached_bytes", {"total": 0})
+
+
+def test_cache_is_bounded_by_bytes_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(cache_service, "RESPONSE_CACHE_MAX_BYTES", 25)
+    cache_service.put_response("a", {}, b"a" * 10)
+    cache_service.put_response("b", {}, b"b" * 10)
+    assert cache_service.get_response("a") == ({}, b"a" * 10)
+
+    cache_service.put_response("c", {}, b"c" * 10)
+    assert cache_service.get_response("b") is None
+    assert cache_service.get_response("a") is not None
+    assert cache_service.get_response("c") is not None
+    assert cache_service._cached_bytes["total"] == 20
+
+    # Replacing an entry counts only the new body; a body over the bound is not cached at all
+    cache_service.put_response("a", {}, b"a" * 5)
+    assert cache_service._cached_bytes["total"] == 15
+    cache_service.put_response("d", {}, b"d" * 26)
+    assert cache_service.get_response("d") is None
+    assert cache_service._cached_bytes["total"] == 15
+
+
+def test_collection_bump_invalidates_the_responses_that_read_it():
+    cache_service.bump_collection_versions(["veneto_events"])
+    versions = cache_service.get_collection_versions()
+    assert versions == {"veneto_events": 1}
+
+    cache_service.put_response("veneto", {"veneto_events": 1}, b"{}")
+    cache_service.put_response("lombardia", {"lombardia_events": 0}, b"{}")
+    cache_service.bump_collection_versions(["veneto_events"])
+    assert cache_service.get_response("veneto") is None
+    assert cache_service.get_response("lombardia") == ({"lombardia_events": 0}, b"{}")
+    assert cache_service._cached_bytes["total"] == 2
+
+
+def test_etag():
+    versions = {"veneto_events": 3}
+    etag = cache_service.make_etag("key", versions)
+    assert etag == cache_service.make_etag("key", {"veneto_events": 3})
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag != cache_service.make_etag("key", {"veneto_events": 4})
+    assert etag != cache_service.make_etag("key", versions, variant="msgpack")
+    assert etag != cache_service.make_etag("key", versions, fallback=True)
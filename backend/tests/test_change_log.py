@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from app.services import change_log
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    path = tmp_path / "changes.jsonl"
+    monkeypatch.setattr(change_log, "CHANGELOG_PATH", str(path))
+    return path
+
+
+def test_versions_increase_and_read_pages(log_path):
+    assert change_log.record_changes([("insert", "veneto_events", "a"), ("update", "veneto_events", "b")]) == 2
+    assert change_log.record_changes([("delete", "veneto_events", "a")]) == 3
+
+    page = change_log.read_changes(since=0, limit=2)
+    assert [change["version"] for change in page["changes"]] == [1, 2]
+    assert page["next_since"] == 2
+    assert page["latest_version"] == 3
+    assert page["epoch"]
+
+    page = change_log.read_changes(since=2)
+    assert [(change["op"], change["id"]) for change in page["changes"]] == [("delete", "a")]
+    assert change_log.read_changes(since=3)["changes"] == []
+
+
+def test_seek_matches_a_full_scan(log_path):
+    for start in range(0, 300, 10):
+        change_log.record_changes(("update", "veneto_events", str(i)) for i in range(start, start + 10))
+    for since in range(0, 305):
+        page = change_log.read_changes(since=since, limit=5)
+        assert [change["version"] for change in page["changes"]] == list(range(since + 1, 301))[:5]
+
+
+def test_new_log_gets_a_new_epoch(log_path):
+    change_log.record_changes([("insert", "veneto_events", "a")])
+    first = change_log.read_changes()["epoch"]
+    log_path.unlink()
+    change_log.record_changes([("insert", "veneto_events", "a")])
+    page = change_log.read_changes()
+    assert page["epoch"] != first
+    assert page["latest_version"] == 1
+
+
+def test_line_being_appended_is_ignored(log_path):
+    change_log.record_changes([("insert", "veneto_events", "a"), ("insert", "veneto_events", "b")])
+    with open(log_path, "ab") as f:
+        f.write(b'{"version": 3, "op": "ins')
+
+    page = change_log.read_changes(since=0)
+    assert [change["version"] for change in page["changes"]] == [1, 2]
+    assert page["latest_version"] == 2
+
+    # A writer that died mid-append: the next writer cuts the fragment and continues the sequence
+    assert change_log.record_changes([("delete", "veneto_events", "a")]) == 3
+    lines = log_path.read_bytes().splitlines()
+    assert [json.loads(line)["version"] for line in lines] == [0, 1, 2, 3]
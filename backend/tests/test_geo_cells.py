@@ -0,0 +1,40 @@
+from shapely.geometry import Point, box
+
+from app.services import geo_cells
+
+
+def test_encode_matches_the_reference_geohash():
+    assert geo_cells.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geo_cells.encode(57.64911, 10.40744, 5) == "u4pru"
+
+
+def test_event_cells_are_prefixes_of_each_other():
+    cells = geo_cells.event_cells(45.4064, 11.8768)
+    assert list(cells) == [geo_cells.geohash_field(p) for p in geo_cells.GEOHASH_PRECISIONS]
+    assert cells["geohash_5"].startswith(cells["geohash_4"])
+    assert cells["geohash_6"].startswith(cells["geohash_5"])
+
+
+def test_cell_size():
+    assert geo_cells.cell_size(4) == (360 / 2 ** 10, 180 / 2 ** 10)
+    assert geo_cells.cell_size(5) == (360 / 2 ** 13, 180 / 2 ** 12)
+
+
+def test_covering_contains_the_cell_of_every_point_inside():
+    polygon = Point(11.87, 45.40).buffer(0.05)
+    cells = set(geo_cells.covering_cells(polygon, 5))
+    for lon, lat in [(11.87, 45.40), (11.91, 45.41), (11.84, 45.37)]:
+        assert geo_cells.encode(lat, lon, 5) in cells
+    assert geo_cells.encode(45.40, 12.5, 5) not in cells
+
+
+def test_choose_covering_picks_the_finest_resolution_within_the_limit():
+    small = box(11.86, 45.39, 11.88, 45.41)
+    field, cells = geo_cells.choose_covering(small, max_cells=64)
+    assert field == "geohash_6"
+    assert len(cells) <= 64
+
+    field, cells = geo_cells.choose_covering(box(11.0, 45.0, 12.0, 46.0), max_cells=64)
+    assert field == "geohash_4"
+
+    assert geo_cells.choose_covering(box(0.0, 30.0, 20.0, 50.0), max_cells=64) is None
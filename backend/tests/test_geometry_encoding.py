@@ -0,0 +1,57 @@
+import msgpack
+import orjson
+import pytest
+from app.services.geometry_encoding import encode_polyline, quantize, simplify_coords, encode_geometry
+
+ROUTE = [[11.0 + i * 0.001, 45.0 + (i % 2) * 0.000001] for i in range(50)]
+BUFFER = [[11.0, 44.99], [11.05, 44.99], [11.05, 45.01], [11.0, 45.01], [11.0, 44.99]]
+
+
+def response():
+    return {"route_coords": [list(c) for c in ROUTE], "buffer_polygon": [list(c) for c in BUFFER], "events": []}
+
+
+def test_polyline_matches_the_reference_encoding():
+    coords = [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]
+    assert encode_polyline(coords) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert encode_polyline([(0.0, 0.0)], precision=6) == "??"
+
+
+def test_quantize():
+    assert quantize([(11.123456, 45.987654)], 3) == [[11.123, 45.988]]
+    assert quantize([(11.123456, 45.987654)], None) == [[11.123456, 45.987654]]
+
+
+def test_simplify_keeps_the_ends_and_drops_invisible_points():
+    simplified = simplify_coords(ROUTE, zoom=10)
+    assert simplified[0] == ROUTE[0] and simplified[-1] == ROUTE[-1]
+    assert len(simplified) < len(ROUTE)
+    assert simplify_coords(ROUTE, zoom=None) is ROUTE
+    ring = simplify_coords(BUFFER, zoom=10, closed=True)
+    assert ring[0] == ring[-1]
+
+
+def test_geojson_format():
+    encoded = encode_geometry(response(), "geojson", 4, None)
+    assert "route_coords" not in encoded and "buffer_polygon" not in encoded
+    assert encoded["geometry_format"] == "geojson"
+    route, buffer = encoded["geojson"]["features"]
+    assert route["properties"]["kind"] == "route"
+    assert route["geometry"]["type"] == "LineString"
+    assert route["geometry"]["coordinates"][1] == [11.001, 45.0]
+    assert buffer["geometry"] == {"type": "Polygon", "coordinates": [[list(c) for c in BUFFER]]}
+
+
+def test_polyline_format_round_trips_through_msgpack():
+    encoded = encode_geometry(response(), "polyline", None, None)
+    assert encoded["route_coords"] == encode_polyline(ROUTE)
+    assert encoded["geometry_format"] == "polyline"
+    # What negotiate_body sends to a client asking for application/msgpack
+    body = orjson.dumps(encoded)
+    packed = msgpack.packb(orjson.loads(body))
+    assert msgpack.unpackb(packed) == encoded
+    assert len(packed) < len(body)
+
+
+def test_responses_without_a_route_are_unchanged():
+    assert encode_geometry({"events": []}, "polyline", None, None) == {"events": []}
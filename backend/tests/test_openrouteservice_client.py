@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from openrouteservice.exceptions import ApiError
+from app.services import openrouteservice_client, resilience
+
+
+def _failing(status):
+    def directions(**kwargs):
+        raise ApiError(status, {"error": "test"})
+    return directions
+
+
+def test_client_errors_do_not_open_the_ors_breaker(monkeypatch):
+    breaker = resilience.DEPENDENCIES["ors"].breaker
+    monkeypatch.setattr(breaker, "failures", 0)
+    monkeypatch.setattr(breaker, "opened_at", None)
+    monkeypatch.setattr(openrouteservice_client.ors_client, "directions", _failing(404))
+    for _ in range(breaker.failure_threshold + 1):
+        with pytest.raises(openrouteservice_client.ORSRequestError):
+            asyncio.run(openrouteservice_client.route([(0, 0), (1, 1)], "driving-car"))
+    assert breaker.state == "closed"
+
+
+@pytest.mark.parametrize("status", [429, 502])
+def test_server_errors_open_the_ors_breaker(monkeypatch, status):
+    breaker = resilience.DEPENDENCIES["ors"].breaker
+    monkeypatch.setattr(breaker, "failures", 0)
+    monkeypatch.setattr(breaker, "opened_at", None)
+    monkeypatch.setattr(openrouteservice_client.ors_client, "directions", _failing(status))
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ApiError):
+            asyncio.run(openrouteservice_client.route([(0, 0), (1, 1)], "driving-car"))
+    assert breaker.state == "open"
@@ -0,0 +1,32 @@
+import time
+import asyncio
+
+import pytest
+from app.services import resilience
+
+
+def test_cancelled_half_open_trial_lets_the_breaker_close():
+    dependency = resilience.Dependency("test", timeout=5, max_concurrency=4)
+    dependency.breaker.opened_at = time.monotonic() - dependency.breaker.reset_seconds
+    assert dependency.breaker.state == "half-open"
+
+    async def scenario():
+        # The trial call is cancelled while its thread is still running (as hybrid_budget does)
+        trial = asyncio.ensure_future(dependency.call(time.sleep, 0.2))
+        await asyncio.sleep(0.05)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert not dependency.breaker.trial_in_flight
+        # The next call becomes the trial and closes the breaker
+        return await dependency.call(lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"
+    assert dependency.breaker.state == "closed"
+
+
+def test_open_breaker_fails_fast():
+    dependency = resilience.Dependency("test", timeout=5, max_concurrency=4)
+    dependency.breaker.opened_at = time.monotonic()
+    with pytest.raises(resilience.ServiceUnavailable):
+        asyncio.run(dependency.call(lambda: "ok"))
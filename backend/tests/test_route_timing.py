@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import pytest
+from app.services.route_timing import coordinate_times, time_slices, slice_window
+
+# Four points 0.01 degrees of longitude apart along a parallel: equal distances
+COORDS = [[11.0, 45.0], [11.01, 45.0], [11.02, 45.0], [11.03, 45.0]]
+
+
+def test_times_follow_step_durations():
+    feature = {"properties": {"segments": [{"steps": [
+        {"way_points": [0, 2], "duration": 100.0},
+        {"way_points": [2, 3], "duration": 300.0},
+    ]}]}}
+    assert coordinate_times(feature, COORDS) == pytest.approx([0.0, 50.0, 100.0, 400.0])
+
+
+def test_times_fall_back_to_the_total_duration():
+    feature = {"properties": {"summary": {"duration": 90.0}}}
+    assert coordinate_times(feature, COORDS) == pytest.approx([0.0, 30.0, 60.0, 90.0])
+
+
+def test_time_slices():
+    times = [0, 600, 1200, 1800, 2400, 3000, 3600]
+    assert time_slices(times, 0, 6, slice_seconds=1200, max_slices=24) == [(0, 2), (2, 4), (4, 6)]
+    # max_slices caps the count by stretching the slices
+    assert time_slices(times, 0, 6, slice_seconds=600, max_slices=2) == [(0, 3), (3, 6)]
+    assert time_slices(times, 0, 1, slice_seconds=600, max_slices=24) == [(0, 1)]
+    assert time_slices([0, 0, 0], 0, 2, slice_seconds=600, max_slices=24) == [(0, 2)]
+
+
+def test_slice_window():
+    start = datetime(2026, 3, 1, 8)
+    end = datetime(2026, 3, 1, 18)
+    # A slice passed 1-2 hours into a 3 hour trip
+    earliest, latest = slice_window(start, end, 3 * 3600, 3600, 7200)
+    assert earliest == start + timedelta(hours=1)
+    assert latest == end - timedelta(hours=1)
+
+    earliest, latest = slice_window(start, end, 3 * 3600, 3600, 7200, dwell_minutes=30)
+    assert latest == end - timedelta(minutes=30)
+
+    # Window shorter than the trip: departure at startinputdate is assumed
+    earliest, latest = slice_window(start, start + timedelta(hours=1), 3 * 3600, 3600, 7200)
+    assert (earliest, latest) == (start + timedelta(hours=1), start + timedelta(hours=2))
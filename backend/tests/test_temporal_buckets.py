@@ -0,0 +1,29 @@
+from datetime import datetime, timezone, timedelta
+
+from app.services.temporal_buckets import parse_datetime, week_bucket, week_buckets_between
+
+
+def test_parse_datetime_returns_utc():
+    assert parse_datetime("2026-03-01T10:00:00Z") == datetime(2026, 3, 1, 10, tzinfo=timezone.utc)
+    assert parse_datetime("2026-03-01T10:00:00") == datetime(2026, 3, 1, 10, tzinfo=timezone.utc)
+    assert parse_datetime("2026-03-01T12:00:00+02:00") == datetime(2026, 3, 1, 10, tzinfo=timezone.utc)
+    assert parse_datetime(None) is None
+    assert parse_datetime("") is None
+    assert parse_datetime("not a date") is None
+
+
+def test_buckets_are_calendar_weeks():
+    monday = datetime(2026, 3, 2, tzinfo=timezone.utc)
+    assert week_bucket(datetime(1970, 1, 5, tzinfo=timezone.utc)) == 0
+    assert week_bucket(monday) == week_bucket(monday + timedelta(days=6, hours=23, minutes=59))
+    assert week_bucket(monday + timedelta(days=7)) == week_bucket(monday) + 1
+    assert week_bucket(monday - timedelta(seconds=1)) == week_bucket(monday) - 1
+
+
+def test_buckets_between():
+    first = week_bucket(datetime(2026, 3, 2, tzinfo=timezone.utc))
+    assert week_buckets_between("2026-03-02T00:00:00", "2026-03-03T00:00:00") == [first]
+    assert week_buckets_between("2026-03-01T00:00:00", "2026-03-16T00:00:00") == [first - 1, first, first + 1, first + 2]
+    assert week_buckets_between("2026-03-01T00:00:00", "2026-03-16T00:00:00", max_buckets=3) is None
+    assert week_buckets_between("2026-03-05T00:00:00", "2026-03-01T00:00:00") is None
+    assert week_buckets_between(None, "2026-03-01T00:00:00") is None
@@ -1,6 +1,8 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta, date
 import json
 import os
@@ -12,42 +14,89 @@ API_BASE_URL = os.getenv("API_URL", "http://localhost:8000")
 
 CREATE_MAP_URL = f"{API_BASE_URL}/create_map"
 SENTENCE_TO_PAYLOAD_URL = f"{API_BASE_URL}/sentencetopayload"
+# Backend URL as reachable from the user's browser (API_URL is often a container hostname); enables
+# lazy loading of event popups by id. Without it, popups show the compact details embedded in the map.
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL")
+
+# (connect, read) timeouts in seconds; natural language extraction calls an LLM and gets a longer read timeout
+CREATE_MAP_TIMEOUT = (5, float(os.getenv("CREATE_MAP_TIMEOUT", "60")))
+SENTENCE_TO_PAYLOAD_TIMEOUT = (5, float(os.getenv("SENTENCE_TO_PAYLOAD_TIMEOUT", "120")))
+# How long identical backend calls are answered from the Streamlit cache
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", "600"))
 
 
 st.set_page_config(layout="wide")
 
 
+class APIError(Exception):
+    def __init__(self, status_code, text):
+        super().__init__(f"{status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+@st.cache_resource
+def get_session():
+    # One pooled keep-alive session shared by all reruns and users of this Streamlit server
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["POST"])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def post_json(url, payload, timeout):
+    response = get_session().post(url, json=payload, timeout=timeout)
+    if response.status_code != 200:
+        # Raising keeps failed calls out of st.cache_data
+        raise APIError(response.status_code, response.text)
+    return response.json()
+
+
+@st.cache_data(ttl=API_CACHE_TTL, show_spinner=False)
+def fetch_create_map(payload_json: str):
+    # Keyed by the canonical JSON of the payload, so reruns with the same inputs never hit the backend
+    return post_json(CREATE_MAP_URL, json.loads(payload_json), CREATE_MAP_TIMEOUT)
+
+
+@st.cache_data(ttl=API_CACHE_TTL, show_spinner=False)
+def fetch_sentence_to_payload(sentence: str):
+    return post_json(SENTENCE_TO_PAYLOAD_URL, {"sentence": sentence}, SENTENCE_TO_PAYLOAD_TIMEOUT)
+
+
 def call_create_map(payload):
-    with st.spinner("Querying events..."):
-        response = requests.post(CREATE_MAP_URL, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        if "message" in data:
-            st.warning(data["message"])
-            return None
-        required_keys = ("origin", "destination", "route_coords", "buffer_polygon")
-        if not all(k in data for k in required_keys):
-            st.error("Incomplete route data received from backend.")
-            return None
-        return data
-    else:
-        st.error(f"API call failed with status {response.status_code}: {response.text}")
+    try:
+        with st.spinner("Querying events..."):
+            data = fetch_create_map(json.dumps(payload, sort_keys=True))
+    except APIError as e:
+        st.error(f"API call failed with status {e.status_code}: {e.text}")
+        return None
+    except requests.RequestException as e:
+        st.error(f"API call failed: {e}")
+        return None
+    if "message" in data:
+        st.warning(data["message"])
         return None
+    required_keys = ("origin", "destination", "route_coords", "buffer_polygon")
+    if not all(k in data for k in required_keys):
+        st.error("Incomplete route data received from backend.")
+        return None
+    return data
 
 
 def call_sentence_to_payload(sentence: str):
-    with st.spinner("Extracting parameters from natural language input..."):
-        response = requests.post(SENTENCE_TO_PAYLOAD_URL, json={"sentence": sentence})
-    if response.status_code == 200:
-        payload = response.json()
-        return payload
-    else:
-        st.error(f"Failed to extract parameters: {response.text}")
+    try:
+        with st.spinner("Extracting parameters from natural language input..."):
+            return fetch_sentence_to_payload(sentence.strip())
+    except APIError as e:
+        st.error(f"Failed to extract parameters: {e.text}")
+        return None
+    except requests.RequestException as e:
+        st.error(f"Failed to extract parameters: {e}")
         return None
 
 
-    mode = st.radio("Select input mode", ["Input manually", "Input natural language"], horizontal=True)
-
 def main():
     mode = st.radio("Select input mode", ["Input manually", "Input natural language"], horizontal=True)
 
@@ -198,7 +247,12 @@ def main():
 
 def display_map_and_events(data, origin_address, destination_address):
     st.subheader("Route Map")
+    components.html(build_map_html(data, origin_address, destination_address), height=720, scrolling=True)
+
 
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_map_html(data, origin_address, destination_address):
+    # Memoized: reruns with unchanged route data reuse the generated OpenLayers page
     route_coords = [[lon, lat] for lat, lon in [(c[1], c[0]) for c in data['route_coords']]]
     route_geojson = {
         "type": "Feature",
@@ -208,20 +262,27 @@ def display_map_and_events(data, origin_address, destination_address):
         }
     }
 
-    markers = []
+    # Events reach the map as one compact GeoJSON source (id and title only); popup details are
+    # fetched by id on click, so descriptions are not inlined for every marker
+    event_features = []
     for event in data.get('events', []):
         lat = event.get('lat') or event.get('latitude')
         lon = event.get('lon') or event.get('longitude')
         if lat is None or lon is None:
             continue
-        markers.append({
-            "title": event.get("title", "No Title"),
-            "address": event.get("address", ""),
-            "description": event.get("description", ""),
-            "start_date": event.get("start_date", "N/A"),
-            "end_date": event.get("end_date", "N/A"),
-            "coordinates": [lon, lat]
+        properties = {"id": event.get("id"), "title": event.get("title", "No Title")}
+        if not PUBLIC_API_URL:
+            properties.update({
+                "address": event.get("address", ""),
+                "start_date": event.get("start_date", "N/A"),
+                "end_date": event.get("end_date", "N/A"),
+            })
+        event_features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [round(lon, 5), round(lat, 5)]},
+            "properties": properties,
         })
+    events_geojson = {"type": "FeatureCollection", "features": event_features}
 
     origin_marker = [data['origin']['lon'], data['origin']['lat']]
     destination_marker = [data['destination']['lon'], data['destination']['lat']]
@@ -278,7 +339,8 @@ def display_map_and_events(data, origin_address, destination_address):
         <div id="map"></div>
         <script type="text/javascript">
             const routeGeoJSON = {json.dumps(route_geojson)};
-            const markers = {json.dumps(markers)};
+            const eventsGeoJSON = {json.dumps(events_geojson, separators=(",", ":"))};
+            const eventsApiUrl = {json.dumps(PUBLIC_API_URL.rstrip("/") if PUBLIC_API_URL else None)};
             const origin = {json.dumps(origin_marker)};
             const destination = {json.dumps(destination_marker)};
             const origin_address = {json.dumps(origin_address)};
@@ -356,22 +418,44 @@ def display_map_and_events(data, origin_address, destination_address):
             }});
             destinationFeature.setStyle(iconStyleDestination);
 
-            const eventFeatures = markers.map(marker => {{
-                const feat = new ol.Feature({{
-                    geometry: new ol.geom.Point(ol.proj.fromLonLat(marker.coordinates)),
-                    name: marker.title,
-                    description: marker.description,
-                    address: marker.address,
-                    start_date: marker.start_date,
-                    end_date: marker.end_date
-                }});
-                feat.setStyle(iconStyleEvent);
-                return feat;
+            const eventSource = new ol.source.Vector({{
+                features: new ol.format.GeoJSON().readFeatures(eventsGeoJSON, {{
+                    featureProjection: "EPSG:3857"
+                }})
+            }});
+
+            const clusterStyleCache = {{}};
+            const eventsLayer = new ol.layer.Vector({{
+                source: new ol.source.Cluster({{
+                    distance: 40,
+                    minDistance: 10,
+                    source: eventSource
+                }}),
+                style: function(cluster) {{
+                    const size = cluster.get('features').length;
+                    if (size === 1) {{
+                        return iconStyleEvent;
+                    }}
+                    if (!clusterStyleCache[size]) {{
+                        clusterStyleCache[size] = new ol.style.Style({{
+                            image: new ol.style.Circle({{
+                                radius: 12 + Math.min(Math.log10(size) * 6, 14),
+                                fill: new ol.style.Fill({{ color: 'rgba(33, 102, 172, 0.85)' }}),
+                                stroke: new ol.style.Stroke({{ color: '#ffffff', width: 2 }})
+                            }}),
+                            text: new ol.style.Text({{
+                                text: String(size),
+                                fill: new ol.style.Fill({{ color: '#ffffff' }})
+                            }})
+                        }});
+                    }}
+                    return clusterStyleCache[size];
+                }}
             }});
 
             const markersLayer = new ol.layer.Vector({{
                 source: new ol.source.Vector({{
-                    features: [originFeature, destinationFeature, ...eventFeatures]
+                    features: [originFeature, destinationFeature]
                 }})
             }});
 
@@ -383,6 +467,7 @@ def display_map_and_events(data, origin_address, destination_address):
                     }}),
                     bufferLayer,
                     routeLayer,
+                    eventsLayer,
                     markersLayer
                 ],
                 view: new ol.View({{
@@ -407,63 +492,99 @@ def display_map_and_events(data, origin_address, destination_address):
             }});
             map.addOverlay(popup);
 
-            map.on('click', function(evt) {{
-                const feature = map.forEachFeatureAtPixel(evt.pixel, function(f) {{ return f; }});
-                if (feature && feature.get('name')) {{
-                    const coordinates = feature.getGeometry().getCoordinates();
-                    const props = feature.getProperties();
-                    popup.setPosition(coordinates);
-                    container.style.display = 'block';
-
-                    if (props.name === "Origin" || props.name === "Destination") {{
-                        container.innerHTML = `<b>${{props.name}}</b><br>${{props.description}}`;
-                    }} else {{
-                        container.innerHTML = `<b>${{props.name}}</b><br>
-                                               <i>${{props.address}}</i><br>
-                                               ${{props.description}}<br>
-                                               <small>Start: ${{props.start_date}} | End: ${{props.end_date}}</small>`;
-                    }}
+            const clickableLayers = {{ layerFilter: layer => layer === eventsLayer || layer === markersLayer }};
 
-                    const mapSize = map.getSize();
-                    const pixel = map.getPixelFromCoordinate(coordinates);
-                    const popupWidth = container.offsetWidth;
-                    const popupHeight = container.offsetHeight;
-                    const margin = 20;
+            function escapeHtml(value) {{
+                const div = document.createElement('div');
+                div.textContent = value == null ? '' : String(value);
+                return div.innerHTML;
+            }}
 
-                    let offsetX = 0;
-                    let offsetY = 0;
+            function eventPopupHtml(props) {{
+                return `<b>${{escapeHtml(props.title)}}</b><br>
+                        <i>${{escapeHtml(props.address)}}</i><br>
+                        ${{escapeHtml(props.description)}}<br>
+                        <small>Start: ${{escapeHtml(props.start_date)}} | End: ${{escapeHtml(props.end_date)}}</small>`;
+            }}
 
-                    if (pixel[0] + popupWidth / 2 > mapSize[0]) {{
-                        offsetX = pixel[0] + popupWidth / 2 - mapSize[0] + margin;
-                    }} else if (pixel[0] - popupWidth / 2 < 0) {{
-                        offsetX = pixel[0] - popupWidth / 2 - margin;
-                    }}
+            function keepPopupInView(coordinates) {{
+                const mapSize = map.getSize();
+                const pixel = map.getPixelFromCoordinate(coordinates);
+                const popupWidth = container.offsetWidth;
+                const popupHeight = container.offsetHeight;
+                const margin = 20;
 
-                    if (pixel[1] - popupHeight < 0) {{
-                        offsetY = pixel[1] - popupHeight - margin;
-                    }}
+                let offsetX = 0;
+                let offsetY = 0;
 
-                    if (offsetX !== 0 || offsetY !== 0) {{
-                        const newCenterPixel = [
-                            pixel[0] - offsetX,
-                            pixel[1] - offsetY
-                        ];
-                        const newCenter = map.getCoordinateFromPixel(newCenterPixel);
-                        map.getView().animate({{center: newCenter, duration: 300}});
-                    }}
-                }} else {{
+                if (pixel[0] + popupWidth / 2 > mapSize[0]) {{
+                    offsetX = pixel[0] + popupWidth / 2 - mapSize[0] + margin;
+                }} else if (pixel[0] - popupWidth / 2 < 0) {{
+                    offsetX = pixel[0] - popupWidth / 2 - margin;
+                }}
+
+                if (pixel[1] - popupHeight < 0) {{
+                    offsetY = pixel[1] - popupHeight - margin;
+                }}
+
+                if (offsetX !== 0 || offsetY !== 0) {{
+                    const newCenterPixel = [
+                        pixel[0] - offsetX,
+                        pixel[1] - offsetY
+                    ];
+                    const newCenter = map.getCoordinateFromPixel(newCenterPixel);
+                    map.getView().animate({{center: newCenter, duration: 300}});
+                }}
+            }}
+
+            map.on('click', function(evt) {{
+                const feature = map.forEachFeatureAtPixel(evt.pixel, function(f) {{ return f; }}, clickableLayers);
+                if (!feature) {{
+                    container.style.display = 'none';
+                    return;
+                }}
+
+                const clustered = feature.get('features');
+                if (clustered && clustered.length > 1) {{
+                    // Zoom into a cluster instead of opening a popup
+                    const extent = ol.extent.createEmpty();
+                    clustered.forEach(f => ol.extent.extend(extent, f.getGeometry().getExtent()));
+                    map.getView().fit(extent, {{ duration: 300, padding: [80, 80, 80, 80], maxZoom: 17 }});
                     container.style.display = 'none';
+                    return;
+                }}
+
+                const target = clustered ? clustered[0] : feature;
+                const coordinates = target.getGeometry().getCoordinates();
+                const props = target.getProperties();
+                popup.setPosition(coordinates);
+                container.style.display = 'block';
+
+                if (props.name === "Origin" || props.name === "Destination") {{
+                    container.innerHTML = `<b>${{props.name}}</b><br>${{escapeHtml(props.description)}}`;
+                }} else if (eventsApiUrl && props.id != null) {{
+                    container.innerHTML = `<b>${{escapeHtml(props.title)}}</b><br><small>Loading...</small>`;
+                    fetch(`${{eventsApiUrl}}/events/${{encodeURIComponent(props.id)}}`)
+                        .then(response => response.ok ? response.json() : Promise.reject(response.status))
+                        .then(details => {{
+                            const loc = details.location || {{}};
+                            container.innerHTML = eventPopupHtml({{ ...details, address: loc.address }});
+                            keepPopupInView(coordinates);
+                        }})
+                        .catch(() => {{
+                            container.innerHTML = `<b>${{escapeHtml(props.title)}}</b><br><small>Details unavailable</small>`;
+                        }});
+                }} else {{
+                    container.innerHTML = eventPopupHtml(props);
                 }}
+                keepPopupInView(coordinates);
             }});
 
             map.on('pointermove', function(evt) {{
                 if (evt.dragging) {{
                     return;
                 }}
-                const hit = map.forEachFeatureAtPixel(evt.pixel, function(feature) {{
-                    const name = feature.get('name');
-                    return name === 'Origin' || name === 'Destination' || (name && name !== '');
-                }});
+                const hit = map.hasFeatureAtPixel(evt.pixel, clickableLayers);
                 map.getTargetElement().style.cursor = hit ? 'pointer' : '';
             }});
         </script>
@@ -471,7 +592,7 @@ def display_map_and_events(data, origin_address, destination_address):
     </html>
     """
 
-    components.html(openlayers_html, height=720, scrolling=True)
+    return openlayers_html
 
 
 def display_events(data):